@@ -0,0 +1,135 @@
+#!/usr/bin/python3
+
+"""
+Compare decoding a whole /stats/contributors response with streaming it through
+ContributorTotals, on a synthetic payload with many contributors.
+
+Usage: python3 benchmarks/bench_contributors.py [contributors] [weeks]
+"""
+
+import json
+import os
+import random
+import sys
+import time
+import tracemalloc
+from typing import Callable, List, Tuple
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.realpath(__file__))))
+
+from contributors import ContributorTotals
+
+
+def synthetic_payload(contributors: int, weeks: int) -> bytes:
+    """
+    Args:
+        contributors (int): number of contributors in the response
+        weeks (int): weeks of history per contributor
+
+    Returns:
+        bytes: a response body shaped like GitHub's
+    """
+
+    random.seed(0)
+    return json.dumps(
+        [
+            {
+                "total": weeks,
+                "weeks": [
+                    {
+                        "w": 1367712000 + 604800 * w,
+                        "a": random.randint(0, 500),
+                        "d": random.randint(0, 100),
+                        "c": random.randint(0, 10),
+                    }
+                    for w in range(weeks)
+                ],
+                "author": {
+                    "login": f"user{i}",
+                    "id": i,
+                    "node_id": f"MDQ6VXNlcj{i}",
+                    "avatar_url": f"https://avatars.githubusercontent.com/u/{i}?v=4",
+                    "url": f"https://api.github.com/users/user{i}",
+                    "html_url": f"https://github.com/user{i}",
+                    "following_url": f"https://api.github.com/users/user{i}/following{{/other_user}}",
+                    "gists_url": f"https://api.github.com/users/user{i}/gists{{/gist_id}}",
+                    "type": "User",
+                    "site_admin": False,
+                },
+            }
+            for i in range(contributors)
+        ],
+        separators=(",", ":"),
+    ).encode()
+
+
+def decode_whole(chunks: List[bytes], login: str) -> Tuple[int, int]:
+    """
+    The previous approach: read the whole body, decode it, then scan for the author.
+    """
+
+    additions = 0
+    deletions = 0
+    for author_obj in json.loads(b"".join(chunks)):
+        if author_obj.get("author", {}).get("login", "") != login:
+            continue
+        for week in author_obj.get("weeks", []):
+            additions += week.get("a", 0)
+            deletions += week.get("d", 0)
+    return additions, deletions
+
+
+def stream(chunks: List[bytes], login: str) -> Tuple[int, int]:
+    """
+    The streaming approach used by Queries.query_contributors.
+    """
+
+    totals = ContributorTotals({login})
+    for chunk in chunks:
+        totals.feed(chunk)
+    return totals.close()
+
+
+def measure(
+    parse: Callable[[List[bytes], str], Tuple[int, int]], chunks: List[bytes]
+) -> Tuple[Tuple[int, int], float, int]:
+    """
+    Returns:
+        Tuple[Tuple[int, int], float, int]: result, best time in seconds of 5 runs, and peak bytes allocated
+    """
+
+    best = float("inf")
+    for _ in range(5):
+        started = time.perf_counter()
+        result = parse(chunks, "user500")
+        best = min(best, time.perf_counter() - started)
+    tracemalloc.start()
+    parse(chunks, "user500")
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return result, best, peak
+
+
+def main() -> None:
+    contributors = int(sys.argv[1]) if len(sys.argv) > 1 else 1000
+    weeks = int(sys.argv[2]) if len(sys.argv) > 2 else 520
+    payload = synthetic_payload(contributors, weeks)
+    chunks = [payload[i : i + 65536] for i in range(0, len(payload), 65536)]
+    print(
+        f"{contributors} contributors, {weeks} weeks each, "
+        f"{len(payload) / 1024 / 1024:0.1f} MiB in {len(chunks)} chunks"
+    )
+
+    results = []
+    for label, parse in [("decode whole", decode_whole), ("stream", stream)]:
+        result, seconds, peak = measure(parse, chunks)
+        results.append(result)
+        print(
+            f"{label:>12}: {1000 * seconds:8.1f} ms, "
+            f"peak {peak / 1024 / 1024:8.2f} MiB, result {result}"
+        )
+    assert results[0] == results[1], "streaming result differs"
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,140 @@
+#!/usr/bin/python3
+
+"""
+Compare the previous per-edge language aggregation in Stats with LanguageAggregator,
+on a synthetic account with many repositories.
+
+Usage: python3 benchmarks/bench_languages.py [repositories] [languages]
+"""
+
+import asyncio
+import os
+import random
+import sys
+import time
+from typing import Any, Callable, Dict, List, Set, Tuple
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.realpath(__file__))))
+
+from languages import TOP_LANGUAGES, LanguageAggregator
+
+EXCLUDED = {"Jupyter Notebook", "Makefile", "Dockerfile", "Shell", "Batchfile"}
+
+
+def synthetic_edges(repositories: int, languages: int) -> List[List[Dict]]:
+    """
+    Args:
+        repositories (int): number of repositories
+        languages (int): number of distinct languages, used with a long-tailed frequency
+
+    Returns:
+        List[List[Dict]]: the language edges of every repository, shaped like GitHub's
+    """
+
+    random.seed(0)
+    names = sorted(EXCLUDED) + [f"Language {i}" for i in range(languages)]
+    weights = [1 / (rank + 1) for rank in range(len(names))]
+    return [
+        [
+            {
+                "size": random.randint(100, 1000000),
+                "node": {"name": name, "color": f"#{random.randint(0, 0xFFFFFF):06x}"},
+            }
+            for name in set(random.choices(names, weights, k=random.randint(1, 15)))
+        ]
+        for _ in range(repositories)
+    ]
+
+
+def previous(repositories: List[List[Dict]]) -> List[Tuple[str, int]]:
+    """
+    The previous approach: await the languages dict and rebuild the exclusion set for
+    every edge, then sort every language to take the top few.
+    """
+
+    exclude_langs: Set[str] = set(EXCLUDED)
+    totals: Dict[str, Any] = dict()
+
+    async def languages() -> Dict[str, Any]:
+        return totals
+
+    async def add_languages(edges: List[Dict]) -> None:
+        for lang in edges:
+            name = lang.get("node", {}).get("name", "Other")
+            languages_ = await languages()
+            if name.lower() in {x.lower() for x in exclude_langs}:
+                continue
+            if name in languages_:
+                languages_[name]["size"] += lang.get("size", 0)
+                languages_[name]["occurrences"] += 1
+            else:
+                languages_[name] = {
+                    "size": lang.get("size", 0),
+                    "occurrences": 1,
+                    "color": lang.get("node", {}).get("color"),
+                }
+
+    async def collect() -> None:
+        for edges in repositories:
+            await add_languages(edges)
+
+    asyncio.run(collect())
+    ranked = sorted(totals.items(), reverse=True, key=lambda t: t[1].get("size"))
+    return [(name, data["size"]) for name, data in ranked[:TOP_LANGUAGES]]
+
+
+def aggregator(repositories: List[List[Dict]]) -> List[Tuple[str, int]]:
+    """
+    LanguageAggregator, as used by Stats.get_stats.
+    """
+
+    totals = LanguageAggregator(EXCLUDED)
+
+    async def collect() -> None:
+        for edges in repositories:
+            totals.add_edges(edges)
+
+    asyncio.run(collect())
+    return [(language.name, language.size) for language in totals.top(TOP_LANGUAGES)]
+
+
+def measure(
+    aggregate: Callable[[List[List[Dict]]], List[Tuple[str, int]]],
+    repositories: List[List[Dict]],
+) -> Tuple[List[Tuple[str, int]], float]:
+    """
+    Returns:
+        Tuple[List[Tuple[str, int]], float]: top languages and best time in seconds of 5 runs
+    """
+
+    best = float("inf")
+    for _ in range(5):
+        started = time.perf_counter()
+        result = aggregate(repositories)
+        best = min(best, time.perf_counter() - started)
+    return result, best
+
+
+def main() -> None:
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 10000
+    languages = int(sys.argv[2]) if len(sys.argv) > 2 else 300
+    repositories = synthetic_edges(count, languages)
+    edges = sum(len(edges) for edges in repositories)
+    print(
+        f"{count} repositories, {edges} language edges, "
+        f"{languages + len(EXCLUDED)} languages ({len(EXCLUDED)} excluded)"
+    )
+
+    results = []
+    for label, aggregate in [("previous", previous), ("aggregator", aggregator)]:
+        result, seconds = measure(aggregate, repositories)
+        results.append(result)
+        print(
+            f"{label:>10}: {1000 * seconds:8.1f} ms, "
+            f"{1e9 * seconds / edges:6.0f} ns per edge"
+        )
+    assert results[0] == results[1], "top languages differ"
+
+
+if __name__ == "__main__":
+    main()
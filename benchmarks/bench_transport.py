@@ -0,0 +1,267 @@
+#!/usr/bin/python3
+
+"""
+Compare HTTP backends and JSON codecs against a local mock of the GitHub API, using
+the same mix of requests a run makes: GraphQL pages and streamed contributor stats.
+
+The http2 backend is served by a separate HTTP/2 server that speaks h2c with prior
+knowledge, so its requests really are multiplexed rather than falling back to HTTP/1.1.
+
+Usage: python3 benchmarks/bench_transport.py [requests] [concurrency]
+"""
+
+import asyncio
+import gzip
+import json
+import os
+import sys
+import time
+from aiohttp import web
+from typing import Dict, List, Optional, Tuple
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.realpath(__file__))))
+
+from github_stats import Queries
+from transport import get_transport
+
+from bench_contributors import synthetic_payload
+
+try:
+    import h2.config
+    import h2.connection
+    import h2.events
+except ImportError:
+    # h2 comes with httpx[http2], without which the http2 backend is skipped anyway
+    h2 = None
+
+GRAPHQL_PAYLOAD = json.dumps(
+    {
+        "data": {
+            "viewer": {
+                "repositories": {
+                    "nodes": [
+                        {
+                            "nameWithOwner": f"user/repo{i}",
+                            "stargazers": {"totalCount": i},
+                            "forkCount": i,
+                            "languages": {
+                                "edges": [
+                                    {
+                                        "size": 1000 * j,
+                                        "node": {
+                                            "name": f"Lang{j}",
+                                            "color": "#ffffff",
+                                        },
+                                    }
+                                    for j in range(10)
+                                ]
+                            },
+                        }
+                        for i in range(100)
+                    ]
+                }
+            }
+        }
+    }
+).encode()
+CONTRIBUTORS_PAYLOAD = synthetic_payload(100, 520)
+
+COMPRESSED = {
+    payload: gzip.compress(payload)
+    for payload in [GRAPHQL_PAYLOAD, CONTRIBUTORS_PAYLOAD]
+}
+
+
+def encode(accept_encoding: str, payload: bytes) -> Tuple[bytes, Dict[str, str]]:
+    """
+    Pick a payload's body, gzipped ahead of time when the client accepts it, so the mock
+    servers' own compression cost doesn't skew the comparison.
+
+    Returns:
+        Tuple[bytes, Dict[str, str]]: the body and its content headers
+    """
+
+    if "gzip" in accept_encoding:
+        return COMPRESSED[payload], {"Content-Encoding": "gzip"}
+    return payload, {}
+
+
+def respond(request: web.Request, payload: bytes) -> web.Response:
+    body, headers = encode(request.headers.get("Accept-Encoding", ""), payload)
+    return web.Response(body=body, content_type="application/json", headers=headers)
+
+
+class Http2Server(asyncio.Protocol):
+    """
+    One h2c connection of the HTTP/2 mock server, sending response bodies as fast as
+    the client's flow control windows allow.
+    """
+
+    def __init__(self):
+        self.connection = h2.connection.H2Connection(
+            h2.config.H2Configuration(client_side=False, header_encoding="utf-8")
+        )
+        self.transport: Optional[asyncio.Transport] = None
+        self.requests: Dict[int, Dict[str, str]] = dict()
+        self.pending: Dict[int, bytes] = dict()
+
+    def connection_made(self, transport: asyncio.BaseTransport) -> None:
+        self.transport = transport  # type: ignore
+        self.connection.initiate_connection()
+        self.transport.write(self.connection.data_to_send())
+
+    def data_received(self, data: bytes) -> None:
+        assert self.transport is not None
+        for event in self.connection.receive_data(data):
+            if isinstance(event, h2.events.RequestReceived):
+                self.requests[event.stream_id] = dict(event.headers)
+            elif isinstance(event, h2.events.DataReceived):
+                self.connection.acknowledge_received_data(
+                    event.flow_controlled_length, event.stream_id
+                )
+            elif isinstance(event, h2.events.StreamEnded):
+                self.respond(event.stream_id)
+            elif isinstance(event, h2.events.StreamReset):
+                self.pending.pop(event.stream_id, None)
+            elif isinstance(event, h2.events.ConnectionTerminated):
+                self.transport.close()
+                return
+        self.send()
+
+    def respond(self, stream_id: int) -> None:
+        request = self.requests.pop(stream_id)
+        payload = (
+            GRAPHQL_PAYLOAD if request[":path"] == "/graphql" else CONTRIBUTORS_PAYLOAD
+        )
+        body, headers = encode(request.get("accept-encoding", ""), payload)
+        response: List[Tuple[str, str]] = [
+            (":status", "200"),
+            ("content-type", "application/json"),
+            ("content-length", str(len(body))),
+        ]
+        self.connection.send_headers(stream_id, response + list(headers.items()))
+        self.pending[stream_id] = body
+
+    def send(self) -> None:
+        assert self.transport is not None
+        for stream_id in list(self.pending):
+            body = self.pending[stream_id]
+            while len(body) > 0:
+                size = min(
+                    self.connection.local_flow_control_window(stream_id),
+                    self.connection.max_outbound_frame_size,
+                )
+                if size <= 0:
+                    break
+                self.connection.send_data(stream_id, body[:size])
+                body = body[size:]
+            if len(body) > 0:
+                self.pending[stream_id] = body
+            else:
+                self.connection.end_stream(stream_id)
+                del self.pending[stream_id]
+        self.transport.write(self.connection.data_to_send())
+
+
+async def start_http2_server() -> Tuple[Optional[asyncio.AbstractServer], str]:
+    """
+    Returns:
+        Tuple[Optional[asyncio.AbstractServer], str]: the running HTTP/2 server, if h2 is installed, and its base URL
+    """
+
+    if h2 is None:
+        return None, ""
+    server = await asyncio.get_running_loop().create_server(Http2Server, "127.0.0.1", 0)
+    port = server.sockets[0].getsockname()[1]
+    return server, f"http://127.0.0.1:{port}"
+
+
+async def start_mock_server() -> Tuple[web.AppRunner, str]:
+    """
+    Returns:
+        Tuple[web.AppRunner, str]: the running HTTP/1.1 server and its base URL
+    """
+
+    async def graphql(request: web.Request) -> web.Response:
+        await request.read()
+        return respond(request, GRAPHQL_PAYLOAD)
+
+    async def contributors(request: web.Request) -> web.Response:
+        return respond(request, CONTRIBUTORS_PAYLOAD)
+
+    app = web.Application()
+    app.router.add_post("/graphql", graphql)
+    app.router.add_get("/repos/{owner}/{repo}/stats/contributors", contributors)
+    runner = web.AppRunner(app, access_log=None)
+    await runner.setup()
+    site = web.TCPSite(runner, "127.0.0.1", 0)
+    await site.start()
+    port = runner.addresses[0][1]
+    return runner, f"http://127.0.0.1:{port}"
+
+
+async def run(
+    url: str, backend: str, codec: str, compress: bool, count: int, concurrency: int
+) -> float:
+    """
+    Returns:
+        float: seconds taken to complete `count` GraphQL and `count` contributor requests
+    """
+
+    options = {"prior_knowledge": True} if backend == "http2" else {}
+    expected = "HTTP/2" if backend == "http2" else "HTTP/1.1"
+    async with get_transport(backend, codec, compress=compress, **options) as transport:
+        async with transport.request(
+            "GET", f"{url}/repos/user/repo0/stats/contributors", {}
+        ) as response:
+            await response.read()
+            assert (
+                response.http_version == expected
+            ), f"{backend} spoke {response.http_version}, expected {expected}"
+        queries = Queries("user50", "token", transport, max_connections=concurrency)
+        queries.api_url = url
+        started = time.perf_counter()
+        await asyncio.gather(
+            *[queries.query("{ viewer { login } }") for _ in range(count)],
+            *[
+                queries.query_contributors(f"user/repo{i}", {"user50"})
+                for i in range(count)
+            ],
+        )
+        return time.perf_counter() - started
+
+
+async def main() -> None:
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    concurrency = int(sys.argv[2]) if len(sys.argv) > 2 else 10
+    runner, url = await start_mock_server()
+    server, http2_url = await start_http2_server()
+    urls = {"aiohttp": url, "http2": http2_url}
+    results: Dict[str, float] = dict()
+    try:
+        for backend in ["aiohttp", "http2"]:
+            for codec in ["json", "orjson"]:
+                for compress in [True, False]:
+                    label = f"{backend}/{codec}/{'gzip' if compress else 'identity'}"
+                    try:
+                        results[label] = await run(
+                            urls[backend], backend, codec, compress, count, concurrency
+                        )
+                    except RuntimeError as e:
+                        print(f"{label:>24}: skipped ({e})")
+                        continue
+                    print(
+                        f"{label:>24}: {1000 * results[label]:8.1f} ms "
+                        f"({2 * count / results[label]:0.0f} requests/s)"
+                    )
+    finally:
+        await runner.cleanup()
+        if server is not None:
+            server.close()
+            await server.wait_closed()
+    if results:
+        print(f"fastest: {min(results, key=lambda k: results[k])}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,159 @@
+#!/usr/bin/python3
+
+import copy
+import json
+import os
+import time
+from typing import Any, Dict, Optional
+
+
+class Checkpoint(object):
+    """
+    Collection progress saved to a local file, so an interrupted run can resume.
+
+    The file holds named sections of JSON data. Writes go to a temporary file that is
+    flushed to disk and then renamed over the checkpoint, so a killed process leaves
+    either the previous checkpoint or the new one, never a partial file. A checkpoint
+    without a path does nothing.
+    """
+
+    VERSION = 1
+
+    def __init__(
+        self,
+        path: Optional[str] = None,
+        key: str = "",
+        max_age: float = 21600.0,
+        interval: float = 1.0,
+    ):
+        self.path = path
+        self.key = key
+        self.max_age = max_age
+        self.interval = interval
+        self.sections: Dict[str, Any] = dict()
+        self.saves = 0
+        self._saved = 0.0
+
+    def load(self) -> bool:
+        """
+        Read the checkpoint if it was saved for the same key within the staleness window.
+
+        Returns:
+            bool: whether progress was restored
+        """
+
+        if self.path is None:
+            return False
+        try:
+            with open(self.path, "r") as f:
+                raw = json.load(f)
+        except FileNotFoundError:
+            return False
+        except (OSError, ValueError):
+            print(f"Ignoring unreadable checkpoint {self.path}")
+            return False
+
+        if raw.get("version") != self.VERSION or raw.get("key") != self.key:
+            print("Ignoring checkpoint saved for a different account or options")
+            return False
+        age = time.time() - raw.get("saved_at", 0)
+        if age > self.max_age:
+            print(f"Ignoring checkpoint saved {age / 60:0.0f} minutes ago")
+            return False
+        self.sections = raw.get("sections", {})
+        print(f"Resuming from checkpoint saved {age:0.0f} seconds ago")
+        return True
+
+    def get(self, section: str, default: Any = None) -> Any:
+        """
+        Args:
+            section (str): name of the section
+            default (Any, optional): value if the section was never saved. Defaults to None.
+
+        Returns:
+            Any: the section's saved value
+        """
+
+        return self.sections.get(section, default)
+
+    def update(self, section: str, value: Any) -> None:
+        """
+        Replace a section with a copy of a value and save it.
+
+        Args:
+            section (str): name of the section
+            value (Any): JSON-serializable value, which may keep changing afterwards
+        """
+
+        self.sections[section] = copy.deepcopy(value)
+        self.save()
+
+    def record(self, section: str, key: str, value: Any) -> None:
+        """
+        Add one completed item to a section, saving at most once per `interval` seconds.
+
+        Args:
+            section (str): name of the section
+            key (str): item within the section, e.g. a repository name
+            value (Any): JSON-serializable value
+        """
+
+        self.sections.setdefault(section, {})[key] = value
+        self.save(force=False)
+
+    def discard(self, section: str) -> None:
+        """
+        Drop a section, e.g. once its items are folded into another one. The change is
+        written with the next save.
+
+        Args:
+            section (str): name of the section
+        """
+
+        self.sections.pop(section, None)
+
+    def save(self, force: bool = True) -> None:
+        """
+        Atomically write the checkpoint.
+
+        Args:
+            force (bool, optional): whether to write even if the last write was less than `interval` seconds ago. Defaults to True.
+        """
+
+        if self.path is None:
+            return
+        now = time.perf_counter()
+        if not force and now - self._saved < self.interval:
+            return
+        self._saved = now
+
+        temporary = f"{self.path}.tmp"
+        with open(temporary, "w") as f:
+            json.dump(
+                {
+                    "version": self.VERSION,
+                    "key": self.key,
+                    "saved_at": time.time(),
+                    "sections": self.sections,
+                },
+                f,
+                separators=(",", ":"),
+            )
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temporary, self.path)
+        self.saves += 1
+
+    def clear(self) -> None:
+        """
+        Delete the checkpoint once a run has completed.
+        """
+
+        self.sections = dict()
+        if self.path is None:
+            return
+        for path in [self.path, f"{self.path}.tmp"]:
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
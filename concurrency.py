@@ -0,0 +1,281 @@
+#!/usr/bin/python3
+
+import asyncio
+import time
+from collections import deque
+from typing import Any, Awaitable, Deque, Dict, List, Optional, Tuple, TypeVar
+
+T = TypeVar("T")
+
+
+class Permit(object):
+    """
+    One in-flight request. Set `status` to the response's status code as soon as the
+    headers arrive, so the limiter can tell healthy responses from throttling and
+    measures latency up to the headers rather than through a streamed body.
+    """
+
+    def __init__(self, limiter: "AdaptiveLimiter"):
+        self.limiter = limiter
+        self._status: Optional[int] = None
+        self.started = 0.0
+        self.responded: Optional[float] = None
+
+    @property
+    def status(self) -> Optional[int]:
+        """
+        Returns:
+            Optional[int]: HTTP status of the response, once it has arrived
+        """
+
+        return self._status
+
+    @status.setter
+    def status(self, status: Optional[int]) -> None:
+        self._status = status
+        self.responded = time.perf_counter()
+
+    async def __aenter__(self) -> "Permit":
+        await self.limiter.acquire()
+        self.started = time.perf_counter()
+        return self
+
+    async def __aexit__(self, exc_type: Any, exc: Any, tb: Any) -> None:
+        latency = (
+            time.perf_counter() if self.responded is None else self.responded
+        ) - self.started
+        if exc_type is not None and issubclass(exc_type, asyncio.CancelledError):
+            self.limiter.release()
+        else:
+            self.limiter.release(self.status, latency, failed=exc_type is not None)
+
+
+class AdaptiveLimiter(object):
+    """
+    Limit in-flight requests with additive-increase/multiplicative-decrease (AIMD).
+
+    Every healthy response raises the limit by `increase / limit`, so it grows by about
+    `increase` per round trip of a full window. A throttled (403/429) or failed (5xx,
+    network error) response, or one much slower than usual and slower than
+    `minimum_spike` seconds, multiplies it by `decrease`, at most once per typical round
+    trip. The limit always stays within [minimum, maximum].
+    """
+
+    def __init__(
+        self,
+        initial: int = 10,
+        minimum: int = 1,
+        maximum: int = 50,
+        increase: float = 1.0,
+        decrease: float = 0.5,
+        latency_spike: float = 4.0,
+        minimum_spike: float = 1.0,
+    ):
+        if not 1 <= minimum <= maximum:
+            raise ValueError("Connection limits must satisfy 1 <= minimum <= maximum")
+        self.minimum = minimum
+        self.maximum = maximum
+        self.limit = float(min(maximum, max(minimum, initial)))
+        self.increase = increase
+        self.decrease = decrease
+        self.latency_spike = latency_spike
+        self.minimum_spike = minimum_spike
+        self.in_flight = 0
+        self.peak_in_flight = 0
+        self.increases = 0
+        self.decreases = 0
+        self.latency: Optional[float] = None
+        self.adjustments: Deque[Tuple[float, int, str]] = deque(maxlen=100)
+        self._last_decrease = 0.0
+        self._waiters: "Deque[asyncio.Future[None]]" = deque()
+
+    def slot(self) -> Permit:
+        """
+        Returns:
+            Permit: async context manager holding one slot for the duration of a request
+        """
+
+        return Permit(self)
+
+    async def acquire(self) -> None:
+        """
+        Wait until fewer requests than the current limit are in flight.
+        """
+
+        if len(self._waiters) == 0 and self.in_flight < int(self.limit):
+            self._take()
+            return
+        waiter: "asyncio.Future[None]" = asyncio.get_running_loop().create_future()
+        self._waiters.append(waiter)
+        try:
+            await waiter
+        except asyncio.CancelledError:
+            if waiter.cancelled():
+                if waiter in self._waiters:
+                    self._waiters.remove(waiter)
+            else:
+                # The slot was handed over just as the wait was cancelled
+                self.in_flight -= 1
+            self._wake()
+            raise
+
+    def release(
+        self,
+        status: Optional[int] = None,
+        latency: Optional[float] = None,
+        failed: bool = False,
+    ) -> None:
+        """
+        Free a slot and adjust the limit from the request's outcome.
+
+        Args:
+            status (Optional[int], optional): HTTP status of the response. Defaults to None.
+            latency (Optional[float], optional): seconds the request took, or None to skip adjusting. Defaults to None.
+            failed (bool, optional): whether the request raised. Defaults to False.
+        """
+
+        self.in_flight -= 1
+        if latency is not None:
+            if failed or status in (403, 429) or (status or 0) >= 500:
+                self._shrink(f"status {status}" if status else "error")
+            elif self.latency is not None and latency > max(
+                self.latency_spike * self.latency, self.minimum_spike
+            ):
+                self._shrink(f"latency {1000 * latency:0.0f} ms")
+            else:
+                self.latency = (
+                    latency
+                    if self.latency is None
+                    else 0.8 * self.latency + 0.2 * latency
+                )
+                self._grow()
+        self._wake()
+
+    def _take(self) -> None:
+        self.in_flight += 1
+        self.peak_in_flight = max(self.peak_in_flight, self.in_flight)
+
+    def _grow(self) -> None:
+        limit = min(self.maximum, self.limit + self.increase / self.limit)
+        if int(limit) > int(self.limit):
+            self.increases += 1
+            self.adjustments.append((time.time(), int(limit), "healthy"))
+        self.limit = limit
+
+    def _shrink(self, reason: str) -> None:
+        now = time.perf_counter()
+        if now - self._last_decrease < (self.latency or 0.0):
+            return
+        self._last_decrease = now
+        limit = max(float(self.minimum), self.limit * self.decrease)
+        if int(limit) < int(self.limit):
+            self.decreases += 1
+            self.adjustments.append((time.time(), int(limit), reason))
+        self.limit = limit
+
+    def _wake(self) -> None:
+        # Slots are handed to waiters in order, so no task has to be spawned to wake them
+        while len(self._waiters) > 0 and self.in_flight < int(self.limit):
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                self._take()
+                waiter.set_result(None)
+
+    def metrics(self) -> Dict[str, Any]:
+        """
+        Returns:
+            Dict[str, Any]: current limit, bounds, usage and adjustment counts
+        """
+
+        return {
+            "limit": int(self.limit),
+            "minimum": self.minimum,
+            "maximum": self.maximum,
+            "in_flight": self.in_flight,
+            "peak_in_flight": self.peak_in_flight,
+            "increases": self.increases,
+            "decreases": self.decreases,
+            "latency_ms": None if self.latency is None else 1000 * self.latency,
+            "adjustments": list(self.adjustments),
+        }
+
+    def summary(self) -> str:
+        """
+        Returns:
+            str: one-line description of the limiter's state
+        """
+
+        latency = "n/a" if self.latency is None else f"{1000 * self.latency:0.0f} ms"
+        return (
+            f"concurrency limit {int(self.limit)} (bounds {self.minimum}-{self.maximum}), "
+            f"peak {self.peak_in_flight} in flight, {self.increases} increases, "
+            f"{self.decreases} decreases, typical latency {latency}"
+        )
+
+
+class TaskGroup(object):
+    """
+    Run coroutines as sibling tasks that finish together, like `asyncio.TaskGroup` on
+    Python 3.11+.
+
+    Leaving the `async with` block waits for every task. If a task raises, the others
+    are cancelled at once, and the first error is raised when the block exits, after
+    every task has finished. If the block itself raises or is cancelled, the tasks are
+    cancelled and drained in the same way, so no request outlives the group.
+    """
+
+    def __init__(self):
+        self._tasks: List["asyncio.Future[Any]"] = list()
+        self._error: Optional[BaseException] = None
+
+    async def __aenter__(self) -> "TaskGroup":
+        return self
+
+    def create_task(self, coroutine: Awaitable[T]) -> "asyncio.Future[T]":
+        """
+        Args:
+            coroutine (Awaitable[T]): work to run in the group
+
+        Returns:
+            asyncio.Future[T]: the task, whose result is available after the block exits
+        """
+
+        task = asyncio.ensure_future(coroutine)
+        task.add_done_callback(self._done)
+        self._tasks.append(task)
+        return task
+
+    def _done(self, task: "asyncio.Future[Any]") -> None:
+        if task.cancelled():
+            return
+        error = task.exception()
+        if error is not None and self._error is None:
+            self._error = error
+            self.cancel()
+
+    def cancel(self) -> None:
+        """
+        Cancel every task that has not finished.
+        """
+
+        for task in self._tasks:
+            if not task.done():
+                task.cancel()
+
+    async def __aexit__(self, exc_type: Any, exc: Any, tb: Any) -> None:
+        if exc_type is not None:
+            self.cancel()
+        cancelled = False
+        pending = [task for task in self._tasks if not task.done()]
+        while len(pending) > 0:
+            try:
+                await asyncio.wait(pending)
+            except asyncio.CancelledError:
+                cancelled = True
+                self.cancel()
+            pending = [task for task in self._tasks if not task.done()]
+        if exc_type is None:
+            if cancelled:
+                raise asyncio.CancelledError()
+            if self._error is not None:
+                raise self._error
@@ -0,0 +1,198 @@
+#!/usr/bin/python3
+
+import json
+import re
+from typing import Optional, Set, Tuple
+
+# Structural characters that change nesting depth or start a string
+STRUCTURE = re.compile(rb'[\[\]{}"]')
+# A complete JSON string, including escapes
+STRING = re.compile(rb'"(?:[^"\\]|\\.)*"')
+# Whitespace and commas between top-level array elements
+SEPARATOR = re.compile(rb"[\s,]*")
+# A top-level element that isn't an object or array
+SCALAR = re.compile(rb'"(?:[^"\\]|\\.)*"|[^,\]\s]+')
+LOGIN = re.compile(rb'"login"\s*:\s*"((?:[^"\\]|\\.)*)"')
+
+
+class ContributorTotals(object):
+    """
+    Incrementally scan a /repos/{repo}/stats/contributors response body, summing the
+    weekly additions and deletions of selected authors.
+
+    Only the contributor currently being read is buffered, and only contributors whose
+    login matches are decoded into Python objects. Everyone else's weeks are skipped as
+    raw bytes.
+    """
+
+    def __init__(self, authors: Set[str]):
+        self.authors = authors
+        self.additions = 0
+        self.deletions = 0
+        self._buffer = bytearray()
+        self._pos = 0
+        self._depth = 0
+        self._started = False
+        self._done = False
+
+    def feed(self, chunk: bytes) -> None:
+        """
+        Scan the next piece of the response body.
+
+        Args:
+            chunk (bytes): bytes following everything fed so far
+        """
+
+        if self._done:
+            return
+        self._buffer += chunk
+        self._scan()
+
+    def close(self) -> Tuple[int, int]:
+        """
+        Returns:
+            Tuple[int, int]: count of lines added and deleted by the authors (Tuple[additions, deletions])
+        """
+
+        self._done = True
+        self._buffer = bytearray()
+        return self.additions, self.deletions
+
+    def _scan(self) -> None:
+        """
+        Consume as many complete tokens as the buffer holds, stopping before any token
+        that is cut off by the end of the buffer.
+        """
+
+        buffer = self._buffer
+        pos = self._pos
+        depth = self._depth
+        size = len(buffer)
+
+        if not self._started:
+            pos = SEPARATOR.match(buffer, pos).end()
+            if pos == size:
+                self._pos = pos
+                return
+            if buffer[pos] != ord("["):
+                # Errors and pending (202) responses are objects, not lists of contributors
+                self._done = True
+                return
+            self._started = True
+            pos += 1
+            depth = 1
+            del buffer[:pos]
+            pos = 0
+            size = len(buffer)
+
+        while pos < size:
+            if depth == 1:
+                pos = SEPARATOR.match(buffer, pos).end()
+                if pos == size:
+                    break
+                char = buffer[pos]
+                if char == ord("]"):
+                    self._done = True
+                    break
+                if char == ord("{") or char == ord("["):
+                    del buffer[:pos]
+                    size = len(buffer)
+                    depth = 2
+                    pos = 1
+                    continue
+                scalar = SCALAR.match(buffer, pos)
+                if scalar is None or scalar.end() == size:
+                    break
+                del buffer[: scalar.end()]
+                pos = 0
+                size = len(buffer)
+                continue
+
+            match = STRUCTURE.search(buffer, pos)
+            if match is None:
+                pos = size
+                break
+            pos = match.start()
+            char = buffer[pos]
+            if char == ord('"'):
+                string = STRING.match(buffer, pos)
+                if string is None:
+                    break
+                pos = string.end()
+            elif char == ord("["):
+                flat = self._flat_array_end(buffer, pos)
+                if flat == size:
+                    break
+                elif flat is not None:
+                    pos = flat
+                else:
+                    depth += 1
+                    pos += 1
+            elif char == ord("{"):
+                depth += 1
+                pos += 1
+            else:
+                depth -= 1
+                pos += 1
+                if depth == 1:
+                    self._element(bytes(buffer[:pos]))
+                    del buffer[:pos]
+                    pos = 0
+                    size = len(buffer)
+
+        self._pos = pos
+        self._depth = depth
+
+    @staticmethod
+    def _flat_array_end(buffer: bytearray, start: int) -> Optional[int]:
+        """
+        Find the end of an array with no nested arrays and no escaped strings, like a
+        contributor's "weeks", using only C-speed byte searches.
+
+        Args:
+            buffer (bytearray): bytes being scanned
+            start (int): position of the array's opening bracket
+
+        Returns:
+            Optional[int]: position after the closing bracket, the buffer size if the array may continue in a later chunk, or None if the array must be scanned token by token
+        """
+
+        end = buffer.find(b"]", start)
+        if end == -1:
+            end = len(buffer)
+        if (
+            buffer.find(b"[", start + 1, end) != -1
+            or buffer.find(b"\\", start, end) != -1
+        ):
+            return None
+        if end == len(buffer):
+            return end
+        # With no escapes, an odd number of quotes means the bracket is inside a string
+        if buffer.count(b'"', start, end) % 2 != 0:
+            return None
+        return end + 1
+
+    def _element(self, raw: bytes) -> None:
+        """
+        Add a contributor's weeks to the totals if one of the authors wrote them.
+
+        Args:
+            raw (bytes): one complete element of the top-level array
+        """
+
+        if not any(
+            json.loads(b'"' + login.group(1) + b'"') in self.authors
+            for login in LOGIN.finditer(raw)
+        ):
+            return
+
+        author_obj = json.loads(raw)
+        if not isinstance(author_obj, dict) or not isinstance(
+            author_obj.get("author", {}), dict
+        ):
+            return
+        if author_obj.get("author", {}).get("login", "") not in self.authors:
+            return
+        for week in author_obj.get("weeks", []):
+            self.additions += week.get("a", 0)
+            self.deletions += week.get("d", 0)
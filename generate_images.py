@@ -3,12 +3,15 @@
 import asyncio
 import os
 import re
-import aiohttp
 import json
 from dotenv import load_dotenv
-from typing import Dict
+from typing import Callable, Dict, Optional
 
-from github_stats import Stats
+from checkpoint import Checkpoint
+from github_stats import OrgStats, Stats, StatsSnapshot
+from languages import TOP_LANGUAGES
+from profiler import profiler
+from transport import get_transport
 
 load_dotenv()
 
@@ -97,119 +100,178 @@ def get_inserted_styles() -> Dict[str, Dict[str, str]]:
     }
 
 
-async def generate_overview(s: Stats, output_path: str) -> None:
+def render_card(
+    template: str, data: Dict[str, str], styles: Dict[str, Dict[str, str]]
+) -> Dict[str, str]:
     """
-    Generate the overview image.
+    Render a card template for every theme.
 
     Args:
-        s (Stats): The Stats object.
+        template (str): The template name, without the .svg extension.
+        data (dict[str, str]): A dictionary of placeholder strings and their associated data.
+        styles (dict[str, dict[str, str]]): The themed styles from get_inserted_styles.
+
+    Returns:
+        dict[str, str]: The rendered card, keyed by theme.
     """
 
-    with open(os.path.join(__TEMPLATE_DIR__, "overview.svg"), "r") as f:
-        template = f.read()
-
-    output = replace_with_data(
-        {
-            "name": await s.name,
-            "stars": f"{await s.stargazers:,}",
-            "forks": f"{await s.forks:,}",
-            "contributions": f"{await s.total_contributions:,}",
-            "lines_changed": f"{((await s.lines_changed)[0] + (await s.lines_changed)[1]):,}",
-            "repos": f"{len(await s.repos):,}",
-        },
-        template,
-    )
+    with open(os.path.join(__TEMPLATE_DIR__, f"{template}.svg"), "r") as f:
+        output = replace_with_data(data, f.read())
 
-    create_output_folder()
+    return {
+        theme: replace_with_data(theme_styles, output)
+        for theme, theme_styles in styles.items()
+    }
 
-    for theme in ["light", "dark"]:
-        with open(
-            os.path.join(
-                __OUTPUT_DIR__, replace_with_data({"theme": theme}, output_path)
-            ),
-            "w",
-        ) as f:
-            f.write(replace_with_data(get_inserted_styles()[theme], output))
 
+def write_card(
+    template: str,
+    data: Dict[str, str],
+    output_path: str,
+    styles: Optional[Dict[str, Dict[str, str]]] = None,
+) -> None:
+    """
+    Render a card template for every theme and write the results to the output folder.
 
-async def generate_languages(s: Stats, output_path: str) -> None:
+    Args:
+        template (str): The template name, without the .svg extension.
+        data (dict[str, str]): A dictionary of placeholder strings and their associated data.
+        output_path (str): The output file name, with a {{ theme }} placeholder.
+        styles (dict[str, dict[str, str]], optional): The themed styles. Defaults to reading styles.json.
     """
-    Generate the languages image.
 
+    with profiler.span(f"Render {template}", "render"):
+        rendered = render_card(
+            template, data, get_inserted_styles() if styles is None else styles
+        )
+
+    create_output_folder()
+
+    with profiler.span(f"Write {template}", "write"):
+        for theme, output in rendered.items():
+            with open(
+                os.path.join(
+                    __OUTPUT_DIR__, replace_with_data({"theme": theme}, output_path)
+                ),
+                "w",
+            ) as f:
+                f.write(output)
+
+
+def overview_data(s: StatsSnapshot) -> Dict[str, str]:
+    """
     Args:
-        s (Stats): The Stats object.
+        s (StatsSnapshot): The collected statistics.
+
+    Returns:
+        dict[str, str]: The placeholder data for the overview image.
+    """
+
+    return {
+        "name": s.name,
+        "stars": f"{s.stargazers:,}",
+        "forks": f"{s.forks:,}",
+        "contributions": f"{s.total_contributions:,}",
+        "lines_changed": f"{(s.lines_changed[0] + s.lines_changed[1]):,}",
+        "repos": f"{s.repo_count:,}",
+    }
+
+
+def languages_data(s: StatsSnapshot) -> Dict[str, str]:
     """
+    Args:
+        s (StatsSnapshot): The collected statistics.
 
-    with open(os.path.join(__TEMPLATE_DIR__, "languages.svg"), "r") as f:
-        template = f.read()
+    Returns:
+        dict[str, str]: The placeholder data for the languages image.
+    """
 
     progress = ""
     lang_list = ""
-    sorted_languages = sorted(
-        (await s.languages).items(), reverse=True, key=lambda t: t[1].get("size")
-    )[:8]
-    for lang, data in sorted_languages:
-        color = data.get("color")
-        color = color if color is not None else "#000000"
-        progress += f'<span style="background-color: {color}; width: {data.get("prop", 0):0.3f}%;"></span>'
+    for lang in s.languages[:TOP_LANGUAGES]:
+        color = lang.color if lang.color is not None else "#000000"
+        progress += f'<span style="background-color: {color}; width: {lang.prop:0.3f}%;"></span>'
         lang_list += f"""<li>
 <svg xmlns="http://www.w3.org/2000/svg" class="octicon" style="fill:{color};" viewBox="0 0 16 16" width="16" height="16"><circle xmlns="http://www.w3.org/2000/svg" cx="8" cy="9" r="5" /></svg>
-<span class="lang">{lang}</span>
-<span class="percent">{data.get("prop", 0):0.2f}%</span>
+<span class="lang">{lang.name}</span>
+<span class="percent">{lang.prop:0.2f}%</span>
 </li>"""
 
-    output = replace_with_data(
-        {
-            "progress": progress,
-            "lang_list": lang_list,
-        },
-        template,
-    )
+    return {
+        "progress": progress,
+        "lang_list": lang_list,
+    }
 
-    create_output_folder()
 
-    for theme in ["light", "dark"]:
-        with open(
-            os.path.join(
-                __OUTPUT_DIR__, replace_with_data({"theme": theme}, output_path)
-            ),
-            "w",
-        ) as f:
-            f.write(replace_with_data(get_inserted_styles()[theme], output))
+def community_data(s: StatsSnapshot) -> Dict[str, str]:
+    """
+    Args:
+        s (StatsSnapshot): The collected statistics.
+
+    Returns:
+        dict[str, str]: The placeholder data for the community image.
+    """
+
+    return {
+        "joined": s.joined,
+        "followers": f"{s.followers:,}",
+        "following": f"{s.following:,}",
+        "stars": f"{s.starred_repos:,}",
+        "sponsoring": f"{s.sponsoring:,}",
+    }
 
 
-async def generate_community(s: Stats, output_path: str) -> None:
+def generate_overview(
+    s: StatsSnapshot,
+    output_path: str,
+    styles: Optional[Dict[str, Dict[str, str]]] = None,
+) -> None:
+    """
+    Generate the overview image.
+
+    Args:
+        s (StatsSnapshot): The collected statistics.
+    """
+
+    write_card("overview", overview_data(s), output_path, styles)
+
+
+def generate_languages(
+    s: StatsSnapshot,
+    output_path: str,
+    styles: Optional[Dict[str, Dict[str, str]]] = None,
+) -> None:
+    """
+    Generate the languages image.
+
+    Args:
+        s (StatsSnapshot): The collected statistics.
+    """
+
+    write_card("languages", languages_data(s), output_path, styles)
+
+
+def generate_community(
+    s: StatsSnapshot,
+    output_path: str,
+    styles: Optional[Dict[str, Dict[str, str]]] = None,
+) -> None:
     """
     Generate the community image.
 
     Args:
-        s (Stats): The Stats object.
+        s (StatsSnapshot): The collected statistics.
     """
 
-    with open(os.path.join(__TEMPLATE_DIR__, "community.svg"), "r") as f:
-        template = f.read()
-
-    output = replace_with_data(
-        {
-            "joined": await s.joined,
-            "followers": f"{await s.followers:,}",
-            "following": f"{await s.following:,}",
-            "stars": f"{await s.starred_repos:,}",
-            "sponsoring": f"{await s.sponsoring:,}",
-        },
-        template,
-    )
+    write_card("community", community_data(s), output_path, styles)
 
-    create_output_folder()
 
-    for theme in ["light", "dark"]:
-        with open(
-            os.path.join(
-                __OUTPUT_DIR__, replace_with_data({"theme": theme}, output_path)
-            ),
-            "w",
-        ) as f:
-            f.write(replace_with_data(get_inserted_styles()[theme], output))
+# Placeholder data for each card, keyed by template name
+CARDS: Dict[str, Callable[[StatsSnapshot], Dict[str, str]]] = {
+    "overview": overview_data,
+    "languages": languages_data,
+    "community": community_data,
+}
 
 
 async def main() -> None:
@@ -245,16 +307,24 @@ async def main() -> None:
             return value
         return default
 
-    access_token = os.getenv("ACCESS_TOKEN")
-    if not access_token:
-        raise Exception("A personal access token is required to proceed!")
-    user = os.getenv("GITHUB_ACTOR")
-    if user is None:
-        raise RuntimeError("Environment variable GITHUB_ACTOR must be set.")
     excluded_repos = string_to_list(os.getenv("EXCLUDED"))
     excluded_langs = string_to_list(os.getenv("EXCLUDED_LANGS"))
     exclude_forked_repos = truthy(os.getenv("EXCLUDE_FORKED_REPOS"), True)
     exclude_private_repos = truthy(os.getenv("EXCLUDE_PRIVATE_REPOS"), True)
+    organization = os.getenv("ORGANIZATION")
+    organization_members = string_to_list(os.getenv("ORGANIZATION_MEMBERS"))
+    http_backend = os.getenv("HTTP_BACKEND") or "aiohttp"
+    json_codec = os.getenv("JSON_CODEC") or "json"
+    http_compression = truthy(os.getenv("HTTP_COMPRESSION"), True)
+    http_pool_size = int(os.getenv("HTTP_POOL_SIZE") or 100)
+    http_keepalive = float(os.getenv("HTTP_KEEPALIVE") or 30)
+    min_connections = int(os.getenv("MIN_CONNECTIONS") or 1)
+    max_connections = int(os.getenv("MAX_CONNECTIONS") or 50)
+    load_snapshot = os.getenv("LOAD_SNAPSHOT")
+    save_snapshot = os.getenv("SAVE_SNAPSHOT")
+    profile_trace = os.getenv("PROFILE_TRACE")
+    checkpoint_path = os.getenv("CHECKPOINT_PATH")
+    checkpoint_max_age = float(os.getenv("CHECKPOINT_MAX_AGE") or 21600)
     generated_image_path = os.getenv("GENERATED_IMAGE_PATH")
     if generated_image_path is None:
         raise RuntimeError("Environment variable GENERATED_IMAGE_PATH must be set.")
@@ -265,39 +335,119 @@ async def main() -> None:
                 "Environment variable GENERATED_IMAGE_PATH must end with .svg"
             )
 
-    async with aiohttp.ClientSession() as session:
-        s = Stats(
-            user,
-            access_token,
-            session,
-            exclude_repos=excluded_repos,
-            exclude_langs=excluded_langs,
-            exclude_forked_repos=exclude_forked_repos,
-            exclude_private_repos=exclude_private_repos,
+    profiler.enabled = bool(profile_trace)
+
+    if load_snapshot:
+        with open(load_snapshot, "r") as f:
+            snapshot = StatsSnapshot.from_json(f.read())
+    else:
+        access_token = os.getenv("ACCESS_TOKEN")
+        if not access_token:
+            raise Exception("A personal access token is required to proceed!")
+        access_tokens = [access_token] + string_to_list(
+            os.getenv("EXTRA_ACCESS_TOKENS")
         )
-        await asyncio.gather(
-            generate_languages(
-                s,
-                replace_with_data(
-                    {
-                        "template": "languages",
-                    },
-                    generated_image_path,
-                ),
-            ),
-            generate_overview(
-                s,
-                replace_with_data(
-                    {
-                        "template": "overview",
-                    },
-                    generated_image_path,
-                ),
-            ),
-            generate_community(
-                s, replace_with_data({"template": "community"}, generated_image_path)
+        user = os.getenv("GITHUB_ACTOR")
+        if user is None:
+            raise RuntimeError("Environment variable GITHUB_ACTOR must be set.")
+
+        # A checkpoint only applies to a run for the same account and options
+        checkpoint = Checkpoint(
+            checkpoint_path or None,
+            key=json.dumps(
+                [
+                    organization or user,
+                    sorted(organization_members),
+                    sorted(excluded_repos),
+                    sorted(excluded_langs),
+                    exclude_forked_repos,
+                    exclude_private_repos,
+                ]
             ),
+            max_age=checkpoint_max_age,
         )
+        checkpoint.load()
+
+        async with get_transport(
+            http_backend,
+            json_codec,
+            compress=http_compression,
+            limit=http_pool_size,
+            keepalive_timeout=http_keepalive,
+        ) as session:
+            if organization:
+                s: Stats = OrgStats(
+                    organization,
+                    access_tokens,
+                    session,
+                    members=set(organization_members) if organization_members else None,
+                    exclude_repos=set(excluded_repos),
+                    exclude_langs=set(excluded_langs),
+                    exclude_forked_repos=exclude_forked_repos,
+                    exclude_private_repos=exclude_private_repos,
+                    max_connections=max_connections,
+                    min_connections=min_connections,
+                    checkpoint=checkpoint,
+                )
+            else:
+                s = Stats(
+                    user,
+                    access_tokens,
+                    session,
+                    exclude_repos=excluded_repos,
+                    exclude_langs=excluded_langs,
+                    exclude_forked_repos=exclude_forked_repos,
+                    exclude_private_repos=exclude_private_repos,
+                    max_connections=max_connections,
+                    min_connections=min_connections,
+                    checkpoint=checkpoint,
+                )
+            snapshot = await s.snapshot()
+            print(s.queries.tokens.summary())
+            print(s.queries.limiter.summary())
+            if len(s.failures) > 0:
+                print(
+                    f"Lines changed are incomplete, {len(s.failures)} repositories "
+                    f"failed: {', '.join(sorted(s.failures))}"
+                )
+            if not s.complete or len(s.failures) > 0:
+                # Keep the progress, so that the next run only retries what is missing
+                checkpoint.save()
+                raise RuntimeError(
+                    "Statistics are incomplete, so no cards were written. "
+                    + (
+                        f"Progress was saved to {checkpoint_path}."
+                        if checkpoint_path
+                        else "Set CHECKPOINT_PATH to resume from the progress made."
+                    )
+                )
+        checkpoint.clear()
+
+    if save_snapshot:
+        with open(save_snapshot, "w") as f:
+            f.write(snapshot.to_json())
+
+    styles = get_inserted_styles()
+    generate_languages(
+        snapshot,
+        replace_with_data({"template": "languages"}, generated_image_path),
+        styles,
+    )
+    generate_overview(
+        snapshot,
+        replace_with_data({"template": "overview"}, generated_image_path),
+        styles,
+    )
+    generate_community(
+        snapshot,
+        replace_with_data({"template": "community"}, generated_image_path),
+        styles,
+    )
+
+    if profile_trace:
+        profiler.export(profile_trace)
+        print(f"Wrote a trace of {len(profiler.spans)} spans to {profile_trace}")
+        print(profiler.summary())
 
 
 if __name__ == "__main__":
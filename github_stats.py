@@ -1,260 +1,907 @@
 #!/usr/bin/python3
 
 import aiohttp
-import requests
 import asyncio
+import copy
+import functools
+import json
 import os
+import time
 import pendulum
-from typing import Dict, List, Optional, Set, Tuple, Any, cast
+from checkpoint import Checkpoint
+from concurrency import AdaptiveLimiter, TaskGroup
+from contributors import ContributorTotals
+from languages import TOP_LANGUAGES, Language, LanguageAggregator
+from profiler import profiled, profiler
+from transport import AiohttpTransport, Transport
+from typing import (
+    Any,
+    Dict,
+    List,
+    Mapping,
+    NamedTuple,
+    Optional,
+    Set,
+    Tuple,
+    Union,
+    cast,
+)
+
+
+class RateLimited(RuntimeError):
+    """
+    Raised when every token a request may use stays rate limited for too long.
+    """
+
+
+class Token(object):
+    """
+    An access token and the rate limit budget GitHub last reported for it.
+    """
+
+    # GitHub's documented hourly budget, assumed until a response says otherwise
+    DEFAULT_BUDGET = 5000
+
+    def __init__(self, value: str, label: str, owner: bool = False):
+        self.value = value
+        self.label = label
+        self.owner = owner
+        self.remaining: Dict[str, int] = dict()
+        self.resets: Dict[str, float] = dict()
+        self.blocked_until = 0.0
+        self.requests: Dict[str, int] = dict()
+        self.limited = 0
+
+    def headroom(self, resource: str) -> int:
+        """
+        Args:
+            resource (str): rate limit resource ("graphql" or "core")
+
+        Returns:
+            int: requests (or GraphQL points) believed to be left for the resource
+        """
+
+        reset = self.resets.get(resource)
+        if reset is not None and reset <= time.time():
+            # The reported window has rolled over, so its count no longer applies
+            del self.resets[resource]
+            self.remaining.pop(resource, None)
+        return self.remaining.get(resource, self.DEFAULT_BUDGET)
+
+
+class TokenPool(object):
+    """
+    Spread requests over several access tokens by tracking each one's rate limit budget.
+
+    The first token belongs to the user whose stats are collected. Requests that rely on
+    its identity (anything on `viewer`, or private repositories) are pinned to it.
+    """
+
+    def __init__(self, tokens: List[str]):
+        if len(tokens) == 0:
+            raise ValueError("At least one access token is required")
+        self.tokens = [
+            Token(value, f"token {i + 1}{' (owner)' if i == 0 else ''}", owner=i == 0)
+            for i, value in enumerate(tokens)
+        ]
+
+    @property
+    def owner(self) -> Token:
+        """
+        Returns:
+            Token: the token belonging to the user whose stats are collected
+        """
+
+        return self.tokens[0]
+
+    def __len__(self) -> int:
+        return len(self.tokens)
+
+    def choose(self, resource: str, pinned: bool = False) -> Optional[Token]:
+        """
+        Pick the token with the most headroom for a resource and reserve one request on it.
+
+        Args:
+            resource (str): rate limit resource ("graphql" or "core")
+            pinned (bool, optional): whether the request must use the owner's token. Defaults to False.
+
+        Returns:
+            Optional[Token]: the chosen token, or None if every candidate is rate limited
+        """
+
+        now = time.time()
+        candidates = [
+            token
+            for token in ([self.owner] if pinned else self.tokens)
+            if token.blocked_until <= now
+        ]
+        if len(candidates) == 0:
+            return None
+        token = max(
+            candidates,
+            key=lambda t: (t.headroom(resource), -t.requests.get(resource, 0)),
+        )
+        token.remaining[resource] = max(0, token.headroom(resource) - 1)
+        token.requests[resource] = token.requests.get(resource, 0) + 1
+        return token
+
+    def unblocked_at(self, pinned: bool = False) -> float:
+        """
+        Args:
+            pinned (bool, optional): whether only the owner's token may be used. Defaults to False.
+
+        Returns:
+            float: time at which the first candidate token comes off its rate limit
+        """
+
+        return min(
+            token.blocked_until for token in ([self.owner] if pinned else self.tokens)
+        )
+
+    def update(
+        self,
+        token: Token,
+        resource: str,
+        status: int,
+        headers: Mapping[str, str],
+        result: Any = None,
+    ) -> bool:
+        """
+        Record the rate limit state reported with a response.
+
+        Args:
+            token (Token): token the request was made with
+            resource (str): rate limit resource the request was counted against
+            status (int): HTTP status code of the response
+            headers (Mapping[str, str]): response headers
+            result (Any, optional): decoded response body. Defaults to None.
+
+        Returns:
+            bool: whether the response was rejected because the token hit a rate limit
+        """
+
+        resource = headers.get("X-RateLimit-Resource", resource)
+        remaining = headers.get("X-RateLimit-Remaining")
+        reset = headers.get("X-RateLimit-Reset")
+        if remaining is not None:
+            token.remaining[resource] = int(remaining)
+        if reset is not None:
+            token.resets[resource] = float(reset)
+
+        errors = result.get("errors", []) if isinstance(result, dict) else []
+        rate_limited = any(
+            isinstance(e, dict) and e.get("type") == "RATE_LIMITED" for e in errors
+        )
+        if status in (403, 429):
+            message = result.get("message", "") if isinstance(result, dict) else ""
+            rate_limited = (
+                rate_limited
+                or remaining == "0"
+                or "Retry-After" in headers
+                or "rate limit" in str(message).lower()
+            )
+        if not rate_limited:
+            return False
+
+        token.limited += 1
+        retry_after = headers.get("Retry-After")
+        if retry_after is not None:
+            token.blocked_until = time.time() + float(retry_after)
+        elif remaining == "0" and reset is not None:
+            token.blocked_until = float(reset)
+        else:
+            token.blocked_until = time.time() + 60
+        print(f"{token.label} hit a rate limit, failing over to another token")
+        return True
+
+    def summary(self) -> str:
+        """
+        Returns:
+            str: per-token breakdown of requests made and budget left
+        """
+
+        lines = []
+        total = sum(sum(t.requests.values()) for t in self.tokens) or 1
+        for token in self.tokens:
+            made = sum(token.requests.values())
+            by_resource = ", ".join(
+                f"{resource}: {count} sent, {token.headroom(resource)} left"
+                for resource, count in sorted(token.requests.items())
+            )
+            lines.append(
+                f"{token.label} (...{token.value[-4:]}): {made} requests "
+                f"({100 * made / total:0.1f}%), {token.limited} rate limited"
+                + (f" [{by_resource}]" if by_resource else "")
+            )
+        return "\n".join(lines)
+
+
+class PageSize(object):
+    """
+    A GraphQL page size that shrinks when GitHub struggles to answer and grows back when it doesn't.
+    """
+
+    # Error types and messages GitHub uses when a query is too heavy to answer in time
+    HEAVY_ERRORS = ("MAX_NODE_LIMIT_EXCEEDED", "RESOURCE_LIMITS_EXCEEDED", "timeout")
+
+    def __init__(
+        self,
+        size: int,
+        minimum: int = 1,
+        maximum: Optional[int] = None,
+        fast: float = 2.0,
+    ):
+        self.size = size
+        self.minimum = minimum
+        self.maximum = size if maximum is None else maximum
+        self.fast = fast
+
+    def shrink(self) -> bool:
+        """
+        Halve the page size after a timeout or resource-limit error.
+
+        Returns:
+            bool: whether the page size changed
+        """
+
+        size = max(self.minimum, self.size // 2)
+        changed = size != self.size
+        self.size = size
+        return changed
+
+    def record(self, elapsed: float) -> None:
+        """
+        Grow the page size back towards its maximum after a fast success.
+
+        Args:
+            elapsed (float): seconds the successful page took
+        """
+
+        if elapsed < self.fast:
+            self.size = min(self.maximum, self.size + max(1, self.size // 2))
+
+    @classmethod
+    def failed(cls, raw_results: Dict, root: str) -> bool:
+        """
+        Args:
+            raw_results (Dict): decoded GraphQL JSON output
+            root (str): top-level field the query selects
+
+        Returns:
+            bool: whether the page is missing or was cut short by a timeout or resource limit
+        """
+
+        if (raw_results.get("data") or {}).get(root) is None:
+            return True
+        for error in raw_results.get("errors") or []:
+            reason = f"{error.get('type', '')} {error.get('message', '')}".lower()
+            if any(heavy.lower() in reason for heavy in cls.HEAVY_ERRORS):
+                return True
+        return False
+
+    @staticmethod
+    def check(connection: Dict, label: str, expected: int, key: str = "nodes") -> int:
+        """
+        Warn when a page holds fewer nodes than it should, so truncation is never silent.
+
+        Args:
+            connection (Dict): GraphQL connection from one page of results
+            label (str): name of the connection for the warning
+            expected (int): page size the query asked for
+            key (str, optional): field holding the page's items. Defaults to "nodes".
+
+        Returns:
+            int: number of non-null nodes on the page
+        """
+
+        items = connection.get(key) or []
+        present = len([item for item in items if item is not None])
+        if present < len(items):
+            print(f"{len(items) - present} {label} on this page could not be loaded")
+        elif connection.get("pageInfo", {}).get("hasNextPage", False) and (
+            len(items) < expected
+        ):
+            print(f"Only {len(items)} of {expected} {label} were returned on this page")
+        return present
+
+
+# A GraphQL document and the variables to send with it
+GraphQLQuery = Tuple[str, Dict[str, Any]]
+
+
+def compact(document: str) -> str:
+    """
+    Args:
+        document (str): GraphQL document without string literals
+
+    Returns:
+        str: the document with runs of whitespace collapsed, to keep request bodies small
+    """
+
+    return " ".join(document.split())
+
+
+REPOSITORY_FIELDS = """
+    nameWithOwner
+    isPrivate
+    stargazers {
+        totalCount
+    }
+    forkCount
+    languages(first: $languagesFirst, orderBy: {field: SIZE, direction: DESC}) {
+        totalCount
+        pageInfo {
+            hasNextPage
+            endCursor
+        }
+        edges {
+            size
+            node {
+                name
+                color
+            }
+        }
+    }
+"""
+
+OVERVIEW = compact("""
+query(
+    $ownedCursor: String,
+    $contribCursor: String,
+    $privacy: RepositoryPrivacy,
+    $first: Int!,
+    $languagesFirst: Int!
+) {
+    viewer {
+        login,
+        name,
+        createdAt,
+        followers {
+            totalCount
+        },
+        following {
+            totalCount
+        },
+        sponsoring {
+            totalCount
+        },
+        starredRepositories {
+            totalCount
+        },
+        repositories(
+            privacy: $privacy,
+            first: $first,
+            orderBy: {
+                field: UPDATED_AT,
+                direction: DESC
+            },
+            isFork: false,
+            ownerAffiliations: [OWNER, ORGANIZATION_MEMBER],
+            after: $ownedCursor
+        ) {
+            totalCount
+            pageInfo {
+                hasNextPage
+                endCursor
+            }
+            nodes {
+                ...Repository
+            }
+        }
+        repositoriesContributedTo(
+            first: $first,
+            includeUserRepositories: false,
+            orderBy: {
+                field: UPDATED_AT,
+                direction: DESC
+            },
+            contributionTypes: [
+                COMMIT,
+                PULL_REQUEST,
+                REPOSITORY,
+                PULL_REQUEST_REVIEW
+            ]
+            after: $contribCursor
+        ) {
+            totalCount
+            pageInfo {
+                hasNextPage
+                endCursor
+            }
+            nodes {
+                ...Repository
+            }
+        }
+    }
+}
+fragment Repository on Repository {""" + REPOSITORY_FIELDS + "}")
+
+REPO_LANGUAGES = compact("""
+query($owner: String!, $name: String!, $cursor: String, $first: Int!) {
+    repository(owner: $owner, name: $name) {
+        languages(
+            first: $first,
+            orderBy: {field: SIZE, direction: DESC},
+            after: $cursor
+        ) {
+            totalCount
+            pageInfo {
+                hasNextPage
+                endCursor
+            }
+            edges {
+                size
+                node {
+                    name
+                    color
+                }
+            }
+        }
+    }
+}
+""")
+
+ORG_OVERVIEW = compact("""
+query(
+    $login: String!,
+    $cursor: String,
+    $privacy: RepositoryPrivacy,
+    $isFork: Boolean,
+    $first: Int!,
+    $languagesFirst: Int!
+) {
+    organization(login: $login) {
+        id,
+        login,
+        name,
+        createdAt,
+        sponsoring {
+            totalCount
+        },
+        repositories(
+            privacy: $privacy,
+            isFork: $isFork,
+            first: $first,
+            orderBy: {
+                field: UPDATED_AT,
+                direction: DESC
+            },
+            after: $cursor
+        ) {
+            totalCount
+            pageInfo {
+                hasNextPage
+                endCursor
+            }
+            nodes {
+                ...Repository
+            }
+        }
+    }
+}
+fragment Repository on Repository {""" + REPOSITORY_FIELDS + "}")
+
+ORG_MEMBERS = compact("""
+query($login: String!, $cursor: String) {
+    organization(login: $login) {
+        membersWithRole(first: 100, after: $cursor) {
+            pageInfo {
+                hasNextPage
+                endCursor
+            }
+            nodes {
+                login
+            }
+        }
+    }
+}
+""")
+
+ORG_REPOSITORIES = compact("""
+query($login: String!, $cursor: String, $privacy: RepositoryPrivacy, $isFork: Boolean) {
+    organization(login: $login) {
+        repositories(privacy: $privacy, isFork: $isFork, first: 100, after: $cursor) {
+            pageInfo {
+                hasNextPage
+                endCursor
+            }
+            nodes {
+                nameWithOwner
+            }
+        }
+    }
+}
+""")
+
+# Contributions a member made to an organization, selected once per year
+ORG_CONTRIB_FIELDS = compact("""
+totalCommitContributions
+totalIssueContributions
+totalPullRequestContributions
+totalPullRequestReviewContributions
+totalRepositoryContributions
+""")
+
+CONTRIB_YEARS = compact("""
+query {
+    viewer {
+        contributionsCollection {
+            contributionYears
+        }
+    }
+}
+""")
 
 
 class Queries(object):
+    # Seconds to wait for a rate-limited token before giving up on the run
+    max_wait = 900.0
+
     def __init__(
         self,
         username: str,
-        access_token: str,
-        session: aiohttp.ClientSession,
-        max_connections: int = 10,
+        access_token: Union[str, List[str], TokenPool],
+        session: Union[aiohttp.ClientSession, Transport],
+        max_connections: int = 50,
+        min_connections: int = 1,
     ):
         self.username = username
-        self.access_token = access_token
-        self.session = session
-        self.semaphore = asyncio.Semaphore(max_connections)
+        if isinstance(access_token, TokenPool):
+            self.tokens = access_token
+        elif isinstance(access_token, str):
+            self.tokens = TokenPool([access_token])
+        else:
+            self.tokens = TokenPool(list(access_token))
+        self.access_token = self.tokens.owner.value
+        self.api_url = "https://api.github.com"
+        self.transport = (
+            session if isinstance(session, Transport) else AiohttpTransport(session)
+        )
+        self.limiter = AdaptiveLimiter(
+            initial=10, minimum=min_connections, maximum=max_connections
+        )
 
-    async def query(self, generated_query: str) -> Dict:
+    async def _token(self, resource: str, pinned: bool) -> Token:
         """
+        Pick a token, waiting for one to come off its rate limit if every candidate is blocked.
+
         Args:
-            generated_query (str): string query to be sent to the API
+            resource (str): rate limit resource ("graphql" or "core")
+            pinned (bool): whether the request must use the owner's token
 
         Returns:
-            Dict: decoded GraphQL JSON output
+            Token: the chosen token
+
+        Raises:
+            RateLimited: if no candidate becomes usable within `max_wait` seconds
         """
 
-        headers = {
-            "Authorization": f"Bearer {self.access_token}",
-        }
-        try:
-            async with self.semaphore:
-                r_async = await self.session.post(
-                    "https://api.github.com/graphql",
-                    headers=headers,
-                    json={"query": generated_query},
-                )
-            result = await r_async.json()
-            if result is not None:
-                return result
-        except:
-            print("aiohttp failed for GraphQL query")
-            async with self.semaphore:
-                r_requests = requests.post(
-                    "https://api.github.com/graphql",
-                    headers=headers,
-                    json={"query": generated_query},
+        while True:
+            token = self.tokens.choose(resource, pinned=pinned)
+            if token is not None:
+                return token
+            wait = self.tokens.unblocked_at(pinned) - time.time()
+            if wait > self.max_wait:
+                raise RateLimited(
+                    f"Every usable token is rate limited for {resource} requests "
+                    f"for another {wait:0.0f} s"
                 )
-                result = r_requests.json()
-                if result is not None:
-                    return result
-        return dict()
+            print(f"Every usable token is rate limited, waiting {wait:0.0f} s")
+            await asyncio.sleep(max(0.0, wait))
 
-    async def query_rest(self, path: str, params: Optional[Dict] = None) -> Dict:
+    @profiled("graphql", name="GraphQL query")
+    async def query(
+        self,
+        document: str,
+        variables: Optional[Dict[str, Any]] = None,
+        pinned: bool = True,
+    ) -> Dict:
         """
         Args:
-            path (str): API path to query
-            params (Optional[Dict], optional): Query parameters to be passed to the API. Defaults to None.
+            document (str): GraphQL document to be sent to the API
+            variables (Optional[Dict[str, Any]], optional): values for the document's variables. Defaults to None.
+            pinned (bool, optional): whether the query must run as the owner's token, as anything on `viewer` does. Defaults to True.
 
         Returns:
-            Dict: deserialized REST JSON output
+            Dict: decoded GraphQL JSON output, or an empty dict if the request failed or timed out
+
+        Raises:
+            RateLimited: if the tokens the query may use stay rate limited for too long
         """
 
-        for _ in range(60):
+        payload = {"query": document, "variables": variables or {}}
+        while True:
+            token = await self._token("graphql", pinned)
             headers = {
-                "Authorization": f"token {self.access_token}",
+                "Authorization": f"Bearer {token.value}",
             }
-            if params is None:
-                params = dict()
-            if path.startswith("/"):
-                path = path[1:]
             try:
-                async with self.semaphore:
-                    r_async = await self.session.get(
-                        f"https://api.github.com/{path}",
-                        headers=headers,
-                        params=tuple(params.items()),
-                    )
-                if r_async.status == 202:
-                    print("A path returned 202. Retrying...")
-                    await asyncio.sleep(2)
+                async with self.limiter.slot() as slot:
+                    async with self.transport.request(
+                        "POST",
+                        f"{self.api_url}/graphql",
+                        headers,
+                        payload=payload,
+                    ) as r_async:
+                        slot.status = r_async.status
+                        try:
+                            result = await r_async.json()
+                        except ValueError:
+                            result = None
+                if self.tokens.update(
+                    token, "graphql", r_async.status, r_async.headers, result
+                ):
                     continue
-
-                result = await r_async.json()
-                if result is not None:
+                if isinstance(result, dict):
                     return result
-            except:
-                async with self.semaphore:
-                    r_requests = requests.get(
-                        f"https://api.github.com/{path}",
-                        headers=headers,
-                        params=tuple(params.items()),
-                    )
-                    if r_requests.status_code == 202:
-                        print("A path returned 202. Retrying...")
-                        await asyncio.sleep(2)
-                        continue
-                    elif r_requests.status_code == 200:
-                        return r_requests.json()
-        print("There were too many 202s. Data for this repository will be incomplete.")
+                print(f"GraphQL query failed with status {r_async.status}")
+            except asyncio.CancelledError:
+                raise
+            except self.transport.timeout_errors:
+                print("GraphQL query timed out")
+            except Exception as error:
+                print(f"GraphQL query failed: {type(error).__name__}: {error}")
+            break
         return dict()
 
-    @staticmethod
-    def overview(
-        contrib_cursor: Optional[str] = None,
-        owned_cursor: Optional[str] = None,
-        options: Dict = dict(),
-    ) -> str:
+    @profiled("rest", name="Contributor stats", detail="repo")
+    async def query_contributors(
+        self, repo: str, authors: Set[str], pinned: bool = False
+    ) -> Tuple[int, int]:
+        """
+        Stream a repository's contributor statistics, keeping only the given authors' weeks.
+
+        Args:
+            repo (str): repository to query, as "owner/name"
+            authors (Set[str]): logins whose changes are counted
+            pinned (bool, optional): whether the request must run as the owner's token, e.g. for private repositories. Defaults to False.
+
+        Returns:
+            Tuple[int, int]: count of lines added and deleted by the authors (Tuple[additions, deletions])
+
+        Raises:
+            RuntimeError: if GitHub refuses the request or never finishes computing the statistics
+            Exception: whatever the transport raises when the request fails or times out
+        """
+
+        url = f"{self.api_url}/repos/{repo}/stats/contributors"
+        for _ in range(60):
+            token = await self._token("core", pinned)
+            headers = {
+                "Authorization": f"token {token.value}",
+            }
+            totals = ContributorTotals(authors)
+            async with self.limiter.slot() as slot:
+                async with self.transport.request("GET", url, headers) as r_async:
+                    slot.status = r_async.status
+                    if r_async.status == 200:
+                        self.tokens.update(
+                            token, "core", r_async.status, r_async.headers
+                        )
+                        async for chunk in r_async.iter_chunks(65536):
+                            totals.feed(chunk)
+                        return totals.close()
+                    elif r_async.status == 204:
+                        # An empty repository has no contributors
+                        return 0, 0
+                    elif r_async.status != 202:
+                        try:
+                            result = await r_async.json()
+                        except ValueError:
+                            result = None
+                        if self.tokens.update(
+                            token, "core", r_async.status, r_async.headers, result
+                        ):
+                            continue
+                        raise RuntimeError(
+                            f"GitHub answered with status {r_async.status}"
+                        )
+            print("A path returned 202. Retrying...")
+            await asyncio.sleep(2)
+        raise RuntimeError("statistics were still being computed after 60 attempts")
+
+    @staticmethod
+    def overview(
+        contrib_cursor: Optional[str] = None,
+        owned_cursor: Optional[str] = None,
+        options: Dict = dict(),
+    ) -> GraphQLQuery:
+        """
+        Returns a GraphQL query to get overall stats for a user
+
+        Args:
+            contrib_cursor (Optional[str], optional): cursor for contributions. Defaults to None.
+            owned_cursor (Optional[str], optional): cursor for owned repositories. Defaults to None.
+            options (Dict, optional): options for the query. Defaults to dict().
+                exclude_private_repos (bool, optional): whether to exclude private repos. Defaults to False.
+                first (int, optional): repositories per page for each connection. Defaults to 100.
+                languages_first (int, optional): languages per repository. Defaults to 10.
+
+        Returns:
+            GraphQLQuery: GraphQL document and variables
+        """
+
+        return OVERVIEW, {
+            "ownedCursor": owned_cursor,
+            "contribCursor": contrib_cursor,
+            "privacy": "PUBLIC" if options.get("exclude_private_repos") else None,
+            "first": options.get("first", 100),
+            "languagesFirst": options.get("languages_first", 10),
+        }
+
+    @staticmethod
+    def repo_languages(
+        name_with_owner: str, cursor: Optional[str] = None, first: int = 10
+    ) -> GraphQLQuery:
+        """
+        Returns a GraphQL query to get the languages of a repository past the first page
+
+        Args:
+            name_with_owner (str): repository to query, as "owner/name"
+            cursor (Optional[str], optional): cursor for languages. Defaults to None.
+            first (int, optional): languages per page. Defaults to 10.
+
+        Returns:
+            GraphQLQuery: GraphQL document and variables
+        """
+
+        owner, name = name_with_owner.split("/", 1)
+        return REPO_LANGUAGES, {
+            "owner": owner,
+            "name": name,
+            "cursor": cursor,
+            "first": first,
+        }
+
+    @staticmethod
+    def org_overview(
+        organization: str, cursor: Optional[str] = None, options: Dict = dict()
+    ) -> GraphQLQuery:
+        """
+        Returns a GraphQL query to get one page of an organization's repositories
+
+        Args:
+            organization (str): login of the organization
+            cursor (Optional[str], optional): cursor for repositories. Defaults to None.
+            options (Dict, optional): options for the query. Defaults to dict().
+                exclude_private_repos (bool, optional): whether to exclude private repos. Defaults to False.
+                exclude_forked_repos (bool, optional): whether to exclude forks. Defaults to False.
+                first (int, optional): repositories per page. Defaults to 100.
+                languages_first (int, optional): languages per repository. Defaults to 10.
+
+        Returns:
+            GraphQLQuery: GraphQL document and variables
+        """
+
+        return ORG_OVERVIEW, {
+            "login": organization,
+            "cursor": cursor,
+            "privacy": "PUBLIC" if options.get("exclude_private_repos") else None,
+            "isFork": False if options.get("exclude_forked_repos") else None,
+            "first": options.get("first", 100),
+            "languagesFirst": options.get("languages_first", 10),
+        }
+
+    @staticmethod
+    def org_members(organization: str, cursor: Optional[str] = None) -> GraphQLQuery:
+        """
+        Returns a GraphQL query to get one page of an organization's members
+
+        Args:
+            organization (str): login of the organization
+            cursor (Optional[str], optional): cursor for members. Defaults to None.
+
+        Returns:
+            GraphQLQuery: GraphQL document and variables
+        """
+
+        return ORG_MEMBERS, {"login": organization, "cursor": cursor}
+
+    @staticmethod
+    def org_repositories(
+        organization: str, cursor: Optional[str] = None, options: Dict = dict()
+    ) -> GraphQLQuery:
+        """
+        Returns a GraphQL query to get one page of an organization's repository names
+
+        Args:
+            organization (str): login of the organization
+            cursor (Optional[str], optional): cursor for repositories. Defaults to None.
+            options (Dict, optional): options for the query. Defaults to dict().
+                exclude_private_repos (bool, optional): whether to exclude private repos. Defaults to False.
+                exclude_forked_repos (bool, optional): whether to exclude forks. Defaults to False.
+
+        Returns:
+            GraphQLQuery: GraphQL document and variables
+        """
+
+        return ORG_REPOSITORIES, {
+            "login": organization,
+            "cursor": cursor,
+            "privacy": "PUBLIC" if options.get("exclude_private_repos") else None,
+            "isFork": False if options.get("exclude_forked_repos") else None,
+        }
+
+    @staticmethod
+    @functools.lru_cache(maxsize=None)
+    def org_contribs_by_year(count: int) -> str:
+        """
+        Build the document for a number of years once, as only the years' bounds change.
+
+        Args:
+            count (int): number of years to query for
+
+        Returns:
+            str: GraphQL document taking $login, $organizationId and $from0/$to0 to $from{count-1}/$to{count-1}
+        """
+
+        arguments = ", ".join(
+            ["$login: String!", "$organizationId: ID!"]
+            + [f"$from{i}: DateTime!, $to{i}: DateTime!" for i in range(count)]
+        )
+        fields = " ".join(
+            f"year{i}: contributionsCollection(organizationID: $organizationId, "
+            f"from: $from{i}, to: $to{i}) {{ {ORG_CONTRIB_FIELDS} }}"
+            for i in range(count)
+        )
+        return f"query({arguments}) {{ user(login: $login) {{ {fields} }} }}"
+
+    @classmethod
+    def org_member_contribs(
+        cls, login: str, organization_id: str, years: List[str]
+    ) -> GraphQLQuery:
         """
-        Returns a GraphQL query to get overall stats for a user
+        Returns a GraphQL query to get a member's contributions to an organization in each year
 
         Args:
-            contrib_cursor (Optional[str], optional): cursor for contributions. Defaults to None.
-            owned_cursor (Optional[str], optional): cursor for owned repositories. Defaults to None.
-            options (Dict, optional): options for the query. Defaults to dict().
-                exclude_private_repos (bool, optional): whether to exclude private repos. Defaults to False.
+            login (str): login of the member
+            organization_id (str): node ID of the organization
+            years (List[str]): list of years to get contributions for
 
         Returns:
-            str: GraphQL query
+            GraphQLQuery: GraphQL document and variables
         """
 
-        exclude_private_repos = options.get("exclude_private_repos", False)
-        return f"""{{
-    viewer {{
-        login,
-        name,
-        createdAt,
-        followers {{
-            totalCount
-        }},
-        following {{
-            totalCount
-        }},
-        sponsoring {{
-            totalCount
-        }},
-        starredRepositories {{
-            totalCount
-        }},
-        repositories(
-            {"privacy: PUBLIC," if exclude_private_repos else ""}
-            first: 100,
-            orderBy: {{
-                field: UPDATED_AT,
-                direction: DESC
-            }},
-            isFork: false,
-            ownerAffiliations: [OWNER, ORGANIZATION_MEMBER],
-            after: {"null" if owned_cursor is None else '"'+ owned_cursor +'"'}
-        ) {{
-            pageInfo {{
-                hasNextPage
-                endCursor
-            }}
-            nodes {{
-                nameWithOwner
-                stargazers {{
-                    totalCount
-                }}
-                forkCount
-                languages(first: 10, orderBy: {{field: SIZE, direction: DESC}}) {{
-                    edges {{
-                        size
-                        node {{
-                            name
-                            color
-                        }}
-                    }}
-                }}
-            }}
-        }}
-        repositoriesContributedTo(
-            first: 100,
-            includeUserRepositories: false,
-            orderBy: {{
-                field: UPDATED_AT,
-                direction: DESC
-            }},
-            contributionTypes: [
-                COMMIT,
-                PULL_REQUEST,
-                REPOSITORY,
-                PULL_REQUEST_REVIEW
-            ]
-            after: {"null" if contrib_cursor is None else '"'+ contrib_cursor +'"'}
-        ) {{
-            pageInfo {{
-                hasNextPage
-                endCursor
-            }}
-            nodes {{
-                nameWithOwner
-                stargazers {{
-                    totalCount
-                }}
-                forkCount
-                languages(first: 10, orderBy: {{field: SIZE, direction: DESC}}) {{
-                    edges {{
-                        size
-                        node {{
-                            name
-                            color
-                        }}
-                    }}
-                }}
-            }}
-        }}
-    }}
-}}"""
+        _, variables = cls.all_contribs(years)
+        variables.update({"login": login, "organizationId": organization_id})
+        return cls.org_contribs_by_year(len(years)), variables
 
     @staticmethod
-    def contrib_years() -> str:
+    def contrib_years() -> GraphQLQuery:
         """
         Returns a GraphQL query to get the years for which a user has contributions
 
         Returns:
-            str: GraphQL query
+            GraphQLQuery: GraphQL document and variables
         """
 
-        return """
-query {
-    viewer {
-        contributionsCollection {
-            contributionYears
-        }
-    }
-}
-"""
+        return CONTRIB_YEARS, {}
 
     @staticmethod
-    def contribs_by_year(year: str) -> str:
+    @functools.lru_cache(maxsize=None)
+    def contribs_by_year(count: int) -> str:
         """
+        Build the document for a number of years once, as only the years' bounds change.
+
         Args:
-            year (str): year to query for
+            count (int): number of years to query for
 
         Returns:
-            str: portion of a GraphQL query with desired info for a given year
+            str: GraphQL document taking $from0/$to0 to $from{count-1}/$to{count-1}
         """
 
-        return f"""
-    year{year}: contributionsCollection(
-        from: "{year}-01-01T00:00:00Z",
-        to: "{int(year) + 1}-01-01T00:00:00Z"
-    ) {{
-        contributionCalendar {{
-            totalContributions
-        }}
-    }}
-"""
+        arguments = ", ".join(
+            f"$from{i}: DateTime!, $to{i}: DateTime!" for i in range(count)
+        )
+        fields = " ".join(
+            f"year{i}: contributionsCollection(from: $from{i}, to: $to{i}) "
+            "{ contributionCalendar { totalContributions } }"
+            for i in range(count)
+        )
+        return f"query({arguments}) {{ viewer {{ {fields} }} }}"
 
     @classmethod
-    def all_contribs(cls, years: List[str]) -> str:
+    def all_contribs(cls, years: List[str]) -> GraphQLQuery:
         """
         Get contributions for all years
 
@@ -262,17 +909,56 @@ query {
             years (List[str]): list of years to get contributions for
 
         Returns:
-            str: GraphQL query
+            GraphQLQuery: GraphQL document and variables
         """
 
-        by_years = "\n".join(map(cls.contribs_by_year, years))
-        return f"""
-query {{
-    viewer {{
-        {by_years}
-    }}
-}}
-"""
+        variables: Dict[str, Any] = dict()
+        for i, year in enumerate(years):
+            variables[f"from{i}"] = f"{year}-01-01T00:00:00Z"
+            variables[f"to{i}"] = f"{int(year) + 1}-01-01T00:00:00Z"
+        return cls.contribs_by_year(len(years)), variables
+
+
+class StatsSnapshot(NamedTuple):
+    """
+    Immutable copy of every statistic the cards need, so rendering needs no API access.
+    """
+
+    name: str
+    joined: str
+    followers: int
+    following: int
+    sponsoring: int
+    starred_repos: int
+    stargazers: int
+    forks: int
+    total_contributions: int
+    lines_changed: Tuple[int, int]
+    repo_count: int
+    languages: Tuple[Language, ...]
+
+    def to_json(self) -> str:
+        """
+        Returns:
+            str: the snapshot serialized as JSON
+        """
+
+        return json.dumps(self._asdict(), separators=(",", ":"))
+
+    @classmethod
+    def from_json(cls, raw: Union[str, bytes]) -> "StatsSnapshot":
+        """
+        Args:
+            raw (Union[str, bytes]): a snapshot serialized with `to_json`
+
+        Returns:
+            StatsSnapshot: the deserialized snapshot
+        """
+
+        fields = json.loads(raw)
+        fields["lines_changed"] = tuple(fields["lines_changed"])
+        fields["languages"] = tuple(Language(*lang) for lang in fields["languages"])
+        return cls(**fields)
 
 
 class Stats(object):
@@ -283,19 +969,28 @@ class Stats(object):
     def __init__(
         self,
         username: str,
-        access_token: str,
-        session: aiohttp.ClientSession,
+        access_token: Union[str, List[str], TokenPool],
+        session: Union[aiohttp.ClientSession, Transport],
         exclude_repos: Optional[Set] = None,
         exclude_langs: Optional[Set] = None,
         exclude_forked_repos: bool = False,
         exclude_private_repos: bool = False,
+        max_connections: int = 50,
+        min_connections: int = 1,
+        checkpoint: Optional[Checkpoint] = None,
     ):
         self.username = username
         self._exclude_forked_repos = exclude_forked_repos
         self._exclude_private_repos = exclude_private_repos
         self._exclude_repos = set() if exclude_repos is None else exclude_repos
         self._exclude_langs = set() if exclude_langs is None else exclude_langs
-        self.queries = Queries(username, access_token, session)
+        self.queries = Queries(
+            username,
+            access_token,
+            session,
+            max_connections=max_connections,
+            min_connections=min_connections,
+        )
 
         self._name: Optional[str] = None
         self._joined: Optional[str] = None
@@ -307,9 +1002,103 @@ class Stats(object):
         self._forks: Optional[int] = None
         self._total_contributions: Optional[int] = None
         self._languages: Optional[Dict[str, Any]] = None
+        self._language_totals = LanguageAggregator(self._exclude_langs)
         self._repos: Optional[Set[str]] = None
+        self._private_repos: Set[str] = set()
+        self._page_size = PageSize(100)
+        self._languages_page_size = PageSize(10)
         self._lines_changed: Optional[Tuple[int, int]] = None
+        self._checkpoint = Checkpoint() if checkpoint is None else checkpoint
+        self.failures: Dict[str, str] = dict()
+        # Cleared when a page of repositories could not be loaded at any page size
+        self.complete = True
+
+    # Attributes saved with the pagination cursors, so a resumed run starts after the
+    # last completed page
+    _checkpointed = [
+        "_name",
+        "_joined",
+        "_followers",
+        "_following",
+        "_sponsoring",
+        "_starred_repos",
+        "_stargazers",
+        "_forks",
+    ]
+
+    def _save_progress(self, section: str, state: Dict[str, Any]) -> None:
+        """
+        Checkpoint the pagination state together with the totals collected so far.
+
+        Args:
+            section (str): checkpoint section
+            state (Dict[str, Any]): cursors and counters of the pagination loop
+        """
+
+        fields = {
+            attribute: getattr(self, attribute) for attribute in self._checkpointed
+        }
+        self._checkpoint.update(
+            section,
+            {
+                **state,
+                "fields": fields,
+                "languages": self._language_totals.state(),
+            },
+        )
+
+    def _restore_progress(self, section: str) -> Dict[str, Any]:
+        """
+        Restore the totals saved by `_save_progress`.
+
+        Args:
+            section (str): checkpoint section
+
+        Returns:
+            Dict[str, Any]: the saved cursors and counters, or an empty dict to start over
+        """
+
+        state = self._checkpoint.get(section) or {}
+        for attribute, value in state.get("fields", {}).items():
+            setattr(self, attribute, copy.deepcopy(value))
+        self._language_totals.restore(state.get("languages", []))
+        # Page sizes start over at their defaults, as whatever shrank them may have passed
+        return state
+
+    async def _repo_lines_changed(
+        self, repo: str, authors: Set[str], pinned: bool = False
+    ) -> Tuple[int, int]:
+        """
+        Count lines changed in one repository, reusing the totals of an interrupted run.
+
+        Args:
+            repo (str): repository to query, as "owner/name"
+            authors (Set[str]): logins whose changes are counted
+            pinned (bool, optional): whether the repository is only visible to the owner's token. Defaults to False.
+
+        Returns:
+            Tuple[int, int]: count of lines added and deleted by the authors (Tuple[additions, deletions])
+        """
 
+        completed = self._checkpoint.get("lines_changed", {})
+        if repo in completed:
+            additions, deletions = completed[repo]
+            return additions, deletions
+        try:
+            additions, deletions = await self.queries.query_contributors(
+                repo, authors, pinned=pinned
+            )
+        except asyncio.CancelledError:
+            raise
+        except Exception as error:
+            # One repository failing leaves its lines out rather than ending the run
+            self.failures[repo] = f"{type(error).__name__}: {error}"
+            print(f"Lines changed in {repo} were not counted: {self.failures[repo]}")
+            return 0, 0
+        self._checkpoint.record("lines_changed", repo, [additions, deletions])
+        return additions, deletions
+
+    @profiled("stats")
     async def get_stats(self) -> None:
         """
         Get statistics about GitHub usage.
@@ -317,22 +1106,52 @@ class Stats(object):
 
         self._stargazers = 0
         self._forks = 0
-        self._languages = dict()
+        self._language_totals = LanguageAggregator(self._exclude_langs)
         self._repos = set()
 
-        next_owned = None
-        next_contrib = None
-        while True:
-            raw_results = await self.queries.query(
-                Queries.overview(
-                    owned_cursor=next_owned,
-                    contrib_cursor=next_contrib,
-                    options={
-                        "exclude_private_repos": self._exclude_private_repos,
-                    },
+        state = self._restore_progress("overview")
+        self._repos = set(state.get("repos", []))
+        self._private_repos = set(state.get("private_repos", []))
+        next_owned, next_contrib = state.get("cursors", [None, None])
+        seen_owned, seen_contrib = state.get("seen", [0, 0])
+        total_owned, total_contrib = state.get("totals", [None, None])
+        done = state.get("done", False)
+        while not done:
+            page_size = self._page_size.size
+            started = time.perf_counter()
+            with profiler.span("Overview page", "pagination", size=page_size):
+                raw_results = await self.queries.query(
+                    *Queries.overview(
+                        owned_cursor=next_owned,
+                        contrib_cursor=next_contrib,
+                        options={
+                            "exclude_private_repos": self._exclude_private_repos,
+                            "first": page_size,
+                            "languages_first": self._languages_page_size.size,
+                        },
+                    )
                 )
-            )
             raw_results = raw_results if raw_results is not None else {}
+            if PageSize.failed(raw_results, "viewer"):
+                shrunk = self._page_size.shrink()
+                shrunk = self._languages_page_size.shrink() or shrunk
+                if shrunk:
+                    print(
+                        "Overview page failed, retrying with "
+                        f"{self._page_size.size} repositories and "
+                        f"{self._languages_page_size.size} languages per page"
+                    )
+                    continue
+                # The page is not saved as done, so a resumed run asks for it again
+                print(
+                    "Overview page failed at the smallest page size. "
+                    "Repository stats will be incomplete."
+                )
+                self.complete = False
+                break
+            elapsed = time.perf_counter() - started
+            self._page_size.record(elapsed)
+            self._languages_page_size.record(elapsed)
 
             self._name = raw_results.get("data", {}).get("viewer", {}).get("name", None)
             if self._name is None:
@@ -384,6 +1203,11 @@ class Stats(object):
                 raw_results.get("data", {}).get("viewer", {}).get("repositories", {})
             )
 
+            seen_owned += PageSize.check(owned_repos, "repositories", page_size)
+            seen_contrib += PageSize.check(
+                contrib_repos, "repositoriesContributedTo", page_size
+            )
+
             repos = owned_repos.get("nodes", [])
             if not self._exclude_forked_repos:
                 repos += contrib_repos.get("nodes", [])
@@ -395,24 +1219,26 @@ class Stats(object):
                 if name in self._repos or name in self._exclude_repos:
                     continue
                 self._repos.add(name)
+                if repo.get("isPrivate", False):
+                    self._private_repos.add(name)
                 self._stargazers += repo.get("stargazers").get("totalCount", 0)
                 self._forks += repo.get("forkCount", 0)
 
-                for lang in repo.get("languages", {}).get("edges", []):
-                    name = lang.get("node", {}).get("name", "Other")
-                    languages = await self.languages
-                    if name.lower() in {x.lower() for x in self._exclude_langs}:
-                        continue
-                    if name in languages:
-                        languages[name]["size"] += lang.get("size", 0)
-                        languages[name]["occurrences"] += 1
-                    else:
-                        languages[name] = {
-                            "size": lang.get("size", 0),
-                            "occurrences": 1,
-                            "color": lang.get("node", {}).get("color"),
-                        }
+                repo_languages = repo.get("languages", {})
+                self._language_totals.add_edges(repo_languages.get("edges", []))
+                if repo_languages.get("pageInfo", {}).get("hasNextPage", False):
+                    await self._more_languages(
+                        name,
+                        repo_languages.get("pageInfo", {}).get("endCursor"),
+                        pinned=name in self._private_repos,
+                    )
+                elif len(repo_languages.get("edges", [])) < repo_languages.get(
+                    "totalCount", 0
+                ):
+                    print(f"Languages for {name} were truncated by the API")
 
+            total_owned = owned_repos.get("totalCount", total_owned)
+            total_contrib = contrib_repos.get("totalCount", total_contrib)
             if owned_repos.get("pageInfo", {}).get(
                 "hasNextPage", False
             ) or contrib_repos.get("pageInfo", {}).get("hasNextPage", False):
@@ -423,13 +1249,114 @@ class Stats(object):
                     "endCursor", next_contrib
                 )
             else:
-                break
+                done = True
+            self._save_progress(
+                "overview",
+                {
+                    "cursors": [next_owned, next_contrib],
+                    "seen": [seen_owned, seen_contrib],
+                    "totals": [total_owned, total_contrib],
+                    "repos": sorted(self._repos),
+                    "private_repos": sorted(self._private_repos),
+                    "done": done,
+                },
+            )
+
+        for connection, seen, total in [
+            ("repositories", seen_owned, total_owned),
+            ("repositoriesContributedTo", seen_contrib, total_contrib),
+        ]:
+            if total is not None and seen < total:
+                print(
+                    f"Only {seen} of {total} {connection} were returned. "
+                    "Repository stats will be incomplete."
+                )
+
+        if self._name is None:
+            self._name = "No Name"
+        if self._joined is None:
+            self._joined = "Unknown"
+        for attribute in ["_followers", "_following", "_sponsoring", "_starred_repos"]:
+            if getattr(self, attribute) is None:
+                setattr(self, attribute, 0)
+        self._languages = self._language_totals.to_dict()
+
+    @profiled("stats")
+    async def _more_languages(
+        self, repo: str, cursor: Optional[str], pinned: bool = False
+    ) -> None:
+        """
+        Page through the languages of a repository that has more than fit in the overview query.
+
+        Args:
+            repo (str): repository to query, as "owner/name"
+            cursor (Optional[str]): cursor after the languages already counted
+            pinned (bool, optional): whether the repository is only visible to the owner's token. Defaults to False.
+        """
+
+        while True:
+            page_size = self._languages_page_size.size
+            started = time.perf_counter()
+            with profiler.span("Languages page", "pagination", repo=repo):
+                raw_results = await self.queries.query(
+                    *Queries.repo_languages(repo, cursor, page_size),
+                    pinned=pinned,
+                )
+            if PageSize.failed(raw_results, "repository"):
+                if self._languages_page_size.shrink():
+                    continue
+                print(f"Languages for {repo} will be incomplete")
+                return
+            self._languages_page_size.record(time.perf_counter() - started)
+
+            languages = raw_results["data"]["repository"].get("languages") or {}
+            PageSize.check(
+                languages,
+                f"languages of {repo}",
+                page_size,
+                key="edges",
+            )
+            self._language_totals.add_edges(languages.get("edges", []))
+            if not languages.get("pageInfo", {}).get("hasNextPage", False):
+                return
+            cursor = languages.get("pageInfo", {}).get("endCursor")
+
+    @profiled("stats")
+    async def snapshot(self) -> StatsSnapshot:
+        """
+        Collect every statistic once into an immutable snapshot.
+
+        Returns:
+            StatsSnapshot: the collected statistics, with the top languages largest first
+        """
 
-        langs_total = sum([v.get("size", 0) for v in self._languages.values()])
-        for k, v in self._languages.items():
-            v["prop"] = 100 * (v.get("size", 0) / langs_total)
+        async def changes() -> Tuple[int, int]:
+            # Lines changed are counted over the repositories collection pages through
+            await self.name
+            return await self.lines_changed
+
+        async with TaskGroup() as group:
+            total_contributions = group.create_task(self.total_contributions)
+            lines_changed = group.create_task(changes())
+        # Languages are totaled during collection, which `languages` waits for
+        await self.languages
+        return StatsSnapshot(
+            name=await self.name,
+            joined=await self.joined,
+            followers=await self.followers,
+            following=await self.following,
+            sponsoring=await self.sponsoring,
+            starred_repos=await self.starred_repos,
+            stargazers=await self.stargazers,
+            forks=await self.forks,
+            total_contributions=total_contributions.result(),
+            lines_changed=lines_changed.result(),
+            repo_count=await self.repo_count,
+            languages=tuple(self._language_totals.top(TOP_LANGUAGES)),
+        )
 
     @property
+    @profiled("stats")
     async def name(self) -> str:
         """
         Returns:
@@ -443,6 +1370,7 @@ class Stats(object):
         return self._name
 
     @property
+    @profiled("stats")
     async def joined(self) -> str:
         """
         Returns:
@@ -456,6 +1384,7 @@ class Stats(object):
         return self._joined
 
     @property
+    @profiled("stats")
     async def followers(self) -> int:
         """
         Returns:
@@ -469,6 +1398,7 @@ class Stats(object):
         return self._followers
 
     @property
+    @profiled("stats")
     async def following(self) -> int:
         """
         Returns:
@@ -482,6 +1412,7 @@ class Stats(object):
         return self._following
 
     @property
+    @profiled("stats")
     async def sponsoring(self) -> int:
         """
         Returns:
@@ -495,6 +1426,7 @@ class Stats(object):
         return self._sponsoring
 
     @property
+    @profiled("stats")
     async def starred_repos(self) -> int:
         """
         Returns:
@@ -508,6 +1440,7 @@ class Stats(object):
         return self._starred_repos
 
     @property
+    @profiled("stats")
     async def stargazers(self) -> int:
         """
         Returns:
@@ -521,6 +1454,7 @@ class Stats(object):
         return self._stargazers
 
     @property
+    @profiled("stats")
     async def forks(self) -> int:
         """
         Returns:
@@ -534,6 +1468,7 @@ class Stats(object):
         return self._forks
 
     @property
+    @profiled("stats")
     async def languages(self) -> Dict:
         """
         Returns:
@@ -547,6 +1482,7 @@ class Stats(object):
         return self._languages
 
     @property
+    @profiled("stats")
     async def languages_proportional(self) -> Dict:
         """
         Returns:
@@ -560,6 +1496,7 @@ class Stats(object):
         return {k: v.get("prop", 0) for (k, v) in self._languages.items()}
 
     @property
+    @profiled("stats")
     async def repos(self) -> Set[str]:
         """
         Returns:
@@ -573,6 +1510,17 @@ class Stats(object):
         return self._repos
 
     @property
+    @profiled("stats")
+    async def repo_count(self) -> int:
+        """
+        Returns:
+            int: number of user's repos
+        """
+
+        return len(await self.repos)
+
+    @property
+    @profiled("stats")
     async def total_contributions(self) -> int:
         """
         Returns:
@@ -582,27 +1530,43 @@ class Stats(object):
         if self._total_contributions is not None:
             return self._total_contributions
 
-        self._total_contributions = 0
         years = (
-            (await self.queries.query(Queries.contrib_years()))
+            (await self.queries.query(*Queries.contrib_years()))
             .get("data", {})
             .get("viewer", {})
             .get("contributionsCollection", {})
             .get("contributionYears", [])
         )
-        by_year = (
-            (await self.queries.query(Queries.all_contribs(years)))
-            .get("data", {})
-            .get("viewer", {})
-            .values()
-        )
-        for year in by_year:
-            self._total_contributions += year.get("contributionCalendar", {}).get(
-                "totalContributions", 0
+        # Years counted before an interrupted run stopped are not queried again
+        missing = [
+            year
+            for year in years
+            if str(year) not in self._checkpoint.get("contributions", {})
+        ]
+        if len(missing) > 0:
+            by_year = (
+                (await self.queries.query(*Queries.all_contribs(missing)))
+                .get("data", {})
+                .get("viewer", {})
             )
+            for i, year in enumerate(missing):
+                if by_year.get(f"year{i}") is None:
+                    continue
+                self._checkpoint.record(
+                    "contributions",
+                    str(year),
+                    by_year[f"year{i}"]
+                    .get("contributionCalendar", {})
+                    .get("totalContributions", 0),
+                )
+            self._checkpoint.save()
+
+        counts = self._checkpoint.get("contributions", {})
+        self._total_contributions = sum(counts.get(str(year), 0) for year in years)
         return cast(int, self._total_contributions)
 
     @property
+    @profiled("stats")
     async def lines_changed(self) -> Tuple[int, int]:
         """
         Returns:
@@ -613,24 +1577,404 @@ class Stats(object):
             return self._lines_changed
         additions = 0
         deletions = 0
-        for repo in await self.repos:
-            r = await self.queries.query_rest(f"/repos/{repo}/stats/contributors")
-            for author_obj in r:
-                if not isinstance(author_obj, dict) or not isinstance(
-                    author_obj.get("author", {}), dict
-                ):
+        async with TaskGroup() as group:
+            changes = [
+                group.create_task(
+                    self._repo_lines_changed(
+                        repo, {self.username}, pinned=repo in self._private_repos
+                    )
+                )
+                for repo in await self.repos
+            ]
+        for change in changes:
+            a, d = change.result()
+            additions += a
+            deletions += d
+        self._checkpoint.save()
+
+        self._lines_changed = (additions, deletions)
+        return self._lines_changed
+
+
+class OrgStats(Stats):
+    """
+    Retrieve and store statistics about a GitHub organization.
+
+    Repositories are streamed one page at a time into running totals, so memory use does
+    not grow with the number of repositories in the organization.
+    """
+
+    def __init__(
+        self,
+        organization: str,
+        access_token: Union[str, List[str], TokenPool],
+        session: Union[aiohttp.ClientSession, Transport],
+        members: Optional[Set[str]] = None,
+        exclude_repos: Optional[Set] = None,
+        exclude_langs: Optional[Set] = None,
+        exclude_forked_repos: bool = False,
+        exclude_private_repos: bool = False,
+        max_connections: int = 50,
+        min_connections: int = 1,
+        checkpoint: Optional[Checkpoint] = None,
+    ):
+        super().__init__(
+            organization,
+            access_token,
+            session,
+            exclude_repos=exclude_repos,
+            exclude_langs=exclude_langs,
+            exclude_forked_repos=exclude_forked_repos,
+            exclude_private_repos=exclude_private_repos,
+            max_connections=max_connections,
+            min_connections=min_connections,
+            checkpoint=checkpoint,
+        )
+        self.organization = organization
+        self._members = members
+        self._organization_id: Optional[str] = None
+        self._created_at: Optional[str] = None
+        self._repo_count: Optional[int] = None
+        self._lock = asyncio.Lock()
+
+    @profiled("stats")
+    async def members(self) -> Set[str]:
+        """
+        Returns:
+            Set[str]: logins whose contributions are counted, defaulting to every member of the organization
+        """
+
+        if self._members is not None:
+            return self._members
+
+        self._members = set()
+        cursor = None
+        while True:
+            raw_results = await self.queries.query(
+                *Queries.org_members(self.organization, cursor),
+                pinned=not self._exclude_private_repos,
+            )
+            members = (
+                (raw_results.get("data") or {})
+                .get("organization", {})
+                .get("membersWithRole", {})
+            )
+            for member in members.get("nodes") or []:
+                if member is not None:
+                    self._members.add(member.get("login"))
+            if not members.get("pageInfo", {}).get("hasNextPage", False):
+                break
+            cursor = members.get("pageInfo", {}).get("endCursor")
+        return self._members
+
+    @profiled("stats")
+    async def get_stats(self) -> None:
+        """
+        Get statistics about the organization, including lines changed by its members.
+        """
+
+        async with self._lock:
+            if self._repo_count is not None:
+                return
+            await self._stream_repositories()
+
+    async def _stream_repositories(self) -> None:
+        """
+        Page through the organization's repositories, folding each page into the totals.
+        """
+
+        self._language_totals = LanguageAggregator(self._exclude_langs)
+        authors = await self.members()
+
+        state = self._restore_progress("organization")
+        stargazers, forks, repo_count, additions, deletions = state.get(
+            "counts", [0, 0, 0, 0, 0]
+        )
+        self._organization_id = state.get("organization_id")
+        self._created_at = state.get("created_at")
+        cursor = state.get("cursor")
+        seen = state.get("seen", 0)
+        total = state.get("total")
+        done = state.get("done", False)
+        # Repositories whose lines changed could not be counted, and whether each is private
+        failed: Dict[str, bool] = state.get("failed", {})
+
+        async def count_lines(repos: Dict[str, bool]) -> None:
+            nonlocal additions, deletions
+            async with TaskGroup() as group:
+                changes = {
+                    name: group.create_task(
+                        self._repo_lines_changed(name, authors, pinned=private)
+                    )
+                    for name, private in repos.items()
+                }
+            for name, change in changes.items():
+                if name in self.failures:
+                    # Left out of the counts, so that a resumed run tries it again
+                    failed[name] = repos[name]
                     continue
-                author = author_obj.get("author", {}).get("login", "")
-                if author != self.username:
+                failed.pop(name, None)
+                a, d = change.result()
+                additions += a
+                deletions += d
+
+        def save_progress() -> None:
+            # Counted repositories are now part of the counts
+            self._checkpoint.discard("lines_changed")
+            self._save_progress(
+                "organization",
+                {
+                    "cursor": cursor,
+                    "seen": seen,
+                    "total": total,
+                    "counts": [stargazers, forks, repo_count, additions, deletions],
+                    "failed": failed,
+                    "organization_id": self._organization_id,
+                    "created_at": self._created_at,
+                    "done": done,
+                },
+            )
+
+        if len(failed) > 0:
+            await count_lines(dict(failed))
+            save_progress()
+
+        while not done:
+            page_size = self._page_size.size
+            started = time.perf_counter()
+            with profiler.span("Organization page", "pagination", size=page_size):
+                raw_results = await self.queries.query(
+                    *Queries.org_overview(
+                        self.organization,
+                        cursor,
+                        options={
+                            "exclude_private_repos": self._exclude_private_repos,
+                            "exclude_forked_repos": self._exclude_forked_repos,
+                            "first": page_size,
+                            "languages_first": self._languages_page_size.size,
+                        },
+                    ),
+                    pinned=not self._exclude_private_repos,
+                )
+            if PageSize.failed(raw_results, "organization"):
+                shrunk = self._page_size.shrink()
+                shrunk = self._languages_page_size.shrink() or shrunk
+                if shrunk:
+                    print(
+                        "Organization page failed, retrying with "
+                        f"{self._page_size.size} repositories per page"
+                    )
                     continue
+                print(
+                    "Organization page failed at the smallest page size. "
+                    "Repository stats will be incomplete."
+                )
+                self.complete = False
+                break
+            elapsed = time.perf_counter() - started
+            self._page_size.record(elapsed)
+            self._languages_page_size.record(elapsed)
+
+            organization = raw_results["data"]["organization"]
+            self._organization_id = organization.get("id")
+            self._name = organization.get("name") or organization.get(
+                "login", "No Name"
+            )
+            self._created_at = organization.get("createdAt")
+            self._joined = (
+                pendulum.parse(self._created_at).diff_for_humans()
+                if self._created_at is not None
+                else "Unknown"
+            )
+            self._followers = 0
+            self._following = 0
+            self._starred_repos = 0
+            self._sponsoring = organization.get("sponsoring", {}).get("totalCount", 0)
+
+            repositories = organization.get("repositories", {})
+            seen += PageSize.check(repositories, "repositories", page_size)
+
+            page = [
+                repo
+                for repo in repositories.get("nodes") or []
+                if repo is not None
+                and repo.get("nameWithOwner") not in self._exclude_repos
+            ]
+            for repo in page:
+                name = repo.get("nameWithOwner")
+                repo_count += 1
+                stargazers += repo.get("stargazers", {}).get("totalCount", 0)
+                forks += repo.get("forkCount", 0)
+
+                repo_languages = repo.get("languages", {})
+                self._language_totals.add_edges(repo_languages.get("edges", []))
+                if repo_languages.get("pageInfo", {}).get("hasNextPage", False):
+                    await self._more_languages(
+                        name,
+                        repo_languages.get("pageInfo", {}).get("endCursor"),
+                        pinned=repo.get("isPrivate", False),
+                    )
+
+            await count_lines(
+                {
+                    repo.get("nameWithOwner"): repo.get("isPrivate", False)
+                    for repo in page
+                }
+            )
 
-                for week in author_obj.get("weeks", []):
-                    additions += week.get("a", 0)
-                    deletions += week.get("d", 0)
+            total = repositories.get("totalCount", total)
+            done = not repositories.get("pageInfo", {}).get("hasNextPage", False)
+            if not done:
+                cursor = repositories.get("pageInfo", {}).get("endCursor", cursor)
+            save_progress()
 
+        if total is not None and seen < total:
+            print(
+                f"Only {seen} of {total} repositories were returned. "
+                "Repository stats will be incomplete."
+            )
+
+        for attribute in ["_name", "_joined"]:
+            if getattr(self, attribute) is None:
+                setattr(self, attribute, "Unknown")
+        for attribute in ["_followers", "_following", "_starred_repos", "_sponsoring"]:
+            if getattr(self, attribute) is None:
+                setattr(self, attribute, 0)
+
+        self._stargazers = stargazers
+        self._forks = forks
         self._lines_changed = (additions, deletions)
+        self._languages = self._language_totals.to_dict()
+        self._repo_count = repo_count
+
+    @property
+    @profiled("stats")
+    async def repos(self) -> Set[str]:
+        """
+        Collecting stats does not keep the repositories it streams, so their names are
+        paged through separately, and only when asked for.
+
+        Returns:
+            Set[str]: names of the organization's repos
+        """
+
+        if self._repos is not None:
+            return self._repos
+
+        repos = set()
+        cursor = None
+        while True:
+            raw_results = await self.queries.query(
+                *Queries.org_repositories(
+                    self.organization,
+                    cursor,
+                    options={
+                        "exclude_private_repos": self._exclude_private_repos,
+                        "exclude_forked_repos": self._exclude_forked_repos,
+                    },
+                ),
+                pinned=not self._exclude_private_repos,
+            )
+            repositories = (
+                (raw_results.get("data") or {})
+                .get("organization", {})
+                .get("repositories", {})
+            )
+            for repo in repositories.get("nodes") or []:
+                if (
+                    repo is not None
+                    and repo.get("nameWithOwner") not in self._exclude_repos
+                ):
+                    repos.add(repo.get("nameWithOwner"))
+            if not repositories.get("pageInfo", {}).get("hasNextPage", False):
+                break
+            cursor = repositories.get("pageInfo", {}).get("endCursor")
+        self._repos = repos
+        return self._repos
+
+    @property
+    @profiled("stats")
+    async def repo_count(self) -> int:
+        """
+        Returns:
+            int: number of the organization's repos
+        """
+
+        if self._repo_count is not None:
+            return self._repo_count
+        await self.get_stats()
+        assert self._repo_count is not None
+        return self._repo_count
+
+    @property
+    @profiled("stats")
+    async def lines_changed(self) -> Tuple[int, int]:
+        """
+        Returns:
+            Tuple[int, int]: count of lines added and deleted by the members (Tuple[additions, deletions])
+        """
+
+        if self._lines_changed is not None:
+            return self._lines_changed
+        await self.get_stats()
+        assert self._lines_changed is not None
         return self._lines_changed
 
+    @property
+    @profiled("stats")
+    async def total_contributions(self) -> int:
+        """
+        Returns:
+            int: count of the members' contributions to the organization since it was created
+        """
+
+        if self._total_contributions is not None:
+            return self._total_contributions
+        if self._organization_id is None:
+            await self.get_stats()
+        if self._organization_id is None:
+            return 0
+
+        # Nobody contributed to the organization before it existed
+        first = (
+            pendulum.parse(self._created_at).year
+            if self._created_at is not None
+            else pendulum.now("UTC").year
+        )
+        years = [str(year) for year in range(first, pendulum.now("UTC").year + 1)]
+
+        async def member_contributions(login: str) -> int:
+            completed = self._checkpoint.get("contributions", {})
+            if login in completed:
+                return completed[login]
+            user = (
+                (
+                    await self.queries.query(
+                        *Queries.org_member_contribs(
+                            login, self._organization_id, years
+                        ),
+                        pinned=not self._exclude_private_repos,
+                    )
+                ).get("data")
+                or {}
+            ).get("user")
+            if user is None:
+                return 0
+            count = sum(
+                sum((user.get(f"year{i}") or {}).values()) for i in range(len(years))
+            )
+            self._checkpoint.record("contributions", login, count)
+            return count
+
+        async with TaskGroup() as group:
+            counts = [
+                group.create_task(member_contributions(login))
+                for login in await self.members()
+            ]
+        self._total_contributions = sum(count.result() for count in counts)
+        self._checkpoint.save()
+        return self._total_contributions
+
 
 async def main() -> None:
     access_token = os.getenv("ACCESS_TOKEN")
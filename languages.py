@@ -0,0 +1,241 @@
+#!/usr/bin/python3
+
+import re
+import sys
+from array import array
+from fnmatch import translate
+from typing import Any, Dict, Iterable, List, NamedTuple, Optional
+
+# Languages shown on the languages card
+TOP_LANGUAGES = 8
+
+
+class Language(NamedTuple):
+    """
+    Aggregated usage of one language.
+    """
+
+    name: str
+    size: int
+    occurrences: int
+    color: Optional[str]
+    prop: float
+
+
+class LanguageAggregator(object):
+    """
+    Sum the size and occurrences of each language across repositories, keeping the
+    largest few ranked as sizes are added.
+
+    Exclusions are compiled once and checked once per distinct language name. Each
+    language gets an interned name and a slot in compact integer arrays, so an edge
+    costs a dict lookup and two additions. Sizes only grow, so the ranked languages
+    only change when a language outgrows the smallest of them, and swapping the two
+    keeps every ranked language at least as large as every other.
+    """
+
+    def __init__(self, exclude: Iterable[str] = (), top: int = TOP_LANGUAGES):
+        """
+        Args:
+            exclude (Iterable[str], optional): language names or fnmatch patterns like "Jupyter*" to leave out, case-insensitively. Defaults to ().
+            top (int, optional): number of largest languages to keep ranked. Defaults to TOP_LANGUAGES.
+        """
+
+        names = set()
+        patterns = []
+        for entry in exclude:
+            if any(char in entry for char in "*?["):
+                patterns.append(translate(entry))
+            else:
+                names.add(entry.casefold())
+        self._excluded_names = names
+        self._excluded_pattern = (
+            re.compile("|".join(patterns), re.IGNORECASE) if patterns else None
+        )
+
+        self.top_size = top
+        self.total = 0
+        # Slot of each language name, or -1 for excluded names
+        self._slots: Dict[str, int] = dict()
+        self._names: List[str] = list()
+        self._colors: List[Optional[str]] = list()
+        self._sizes = array("q")
+        self._occurrences = array("q")
+        self._ranked: List[int] = list()
+        self._is_ranked = bytearray()
+        self._floor = -1
+
+    def excluded(self, name: str) -> bool:
+        """
+        Args:
+            name (str): language name
+
+        Returns:
+            bool: whether the language is left out of the totals
+        """
+
+        if name.casefold() in self._excluded_names:
+            return True
+        return (
+            self._excluded_pattern is not None
+            and self._excluded_pattern.fullmatch(name) is not None
+        )
+
+    def _slot(self, name: str, color: Optional[str]) -> int:
+        """
+        Args:
+            name (str): language name seen for the first time
+            color (Optional[str]): language color
+
+        Returns:
+            int: the new slot, or -1 if the language is excluded
+        """
+
+        name = sys.intern(name)
+        if self.excluded(name):
+            self._slots[name] = -1
+            return -1
+        slot = len(self._names)
+        self._slots[name] = slot
+        self._names.append(name)
+        self._colors.append(color)
+        self._sizes.append(0)
+        self._occurrences.append(0)
+        self._is_ranked.append(0)
+        return slot
+
+    def add(
+        self, name: str, size: int, color: Optional[str] = None, occurrences: int = 1
+    ) -> None:
+        """
+        Args:
+            name (str): language name
+            size (int): bytes of code in the language
+            color (Optional[str], optional): language color. Defaults to None.
+            occurrences (int, optional): repositories using the language. Defaults to 1.
+        """
+
+        slot = self._slots.get(name)
+        if slot is None:
+            slot = self._slot(name, color)
+        if slot < 0:
+            return
+        self._sizes[slot] += size
+        self._occurrences[slot] += occurrences
+        self.total += size
+        self._rank(slot)
+
+    def _rank(self, slot: int) -> None:
+        """
+        Update the ranked languages after a language grew.
+
+        Args:
+            slot (int): slot of the language
+        """
+
+        sizes = self._sizes
+        ranked = self._ranked
+        if self._is_ranked[slot]:
+            if slot != self._floor:
+                return
+        elif len(ranked) < self.top_size:
+            ranked.append(slot)
+            self._is_ranked[slot] = 1
+        elif self._floor >= 0 and sizes[slot] > sizes[self._floor]:
+            self._is_ranked[self._floor] = 0
+            ranked[ranked.index(self._floor)] = slot
+            self._is_ranked[slot] = 1
+        else:
+            return
+        # The smallest ranked language is the one a growing language would replace
+        self._floor = min(ranked, key=sizes.__getitem__)
+
+    def add_edges(self, edges: List[Dict]) -> None:
+        """
+        Add a repository's languages, with `add` inlined as this runs for every edge.
+
+        Args:
+            edges (List[Dict]): language edges from a GraphQL languages connection
+        """
+
+        slots = self._slots
+        sizes = self._sizes
+        occurrences = self._occurrences
+        is_ranked = self._is_ranked
+        total = 0
+        for edge in edges:
+            node = edge.get("node") or {}
+            name = node.get("name", "Other")
+            slot = slots.get(name)
+            if slot is None:
+                slot = self._slot(name, node.get("color"))
+            if slot < 0:
+                continue
+            size = edge.get("size", 0)
+            sizes[slot] += size
+            occurrences[slot] += 1
+            total += size
+            # Only the smallest ranked language or an unranked one can change the ranking
+            if not is_ranked[slot] or slot == self._floor:
+                self._rank(slot)
+        self.total += total
+
+    def _language(self, slot: int) -> Language:
+        size = self._sizes[slot]
+        return Language(
+            name=self._names[slot],
+            size=size,
+            occurrences=self._occurrences[slot],
+            color=self._colors[slot],
+            prop=100 * size / self.total if self.total else 0.0,
+        )
+
+    def top(self, count: Optional[int] = None) -> List[Language]:
+        """
+        Args:
+            count (Optional[int], optional): number of languages, at most the number kept ranked. Defaults to all of them.
+
+        Returns:
+            List[Language]: the largest languages, largest first
+        """
+
+        sizes = self._sizes
+        ranked = sorted(self._ranked, key=lambda slot: sizes[slot], reverse=True)
+        return [self._language(slot) for slot in ranked[:count]]
+
+    def to_dict(self) -> Dict[str, Dict[str, Any]]:
+        """
+        Returns:
+            Dict[str, Dict[str, Any]]: size, occurrences, color and proportion of every language, keyed by name
+        """
+
+        languages = dict()
+        for slot in range(len(self._names)):
+            language = self._language(slot)
+            languages[language.name] = {
+                "size": language.size,
+                "occurrences": language.occurrences,
+                "color": language.color,
+                "prop": language.prop,
+            }
+        return languages
+
+    def state(self) -> List[List[Any]]:
+        """
+        Returns:
+            List[List[Any]]: the totals as JSON-serializable rows, for `restore`
+        """
+
+        return [
+            [self._names[slot], self._sizes[slot], self._occurrences[slot], color]
+            for slot, color in enumerate(self._colors)
+        ]
+
+    def restore(self, rows: List[List[Any]]) -> None:
+        """
+        Args:
+            rows (List[List[Any]]): totals saved with `state`
+        """
+
+        for name, size, occurrences, color in rows:
+            self.add(name, size, color, occurrences)
@@ -0,0 +1,227 @@
+#!/usr/bin/python3
+
+import asyncio
+import os
+import time
+from aiohttp import web
+from dotenv import load_dotenv
+from typing import Dict, Optional, Tuple
+
+from generate_images import (
+    CARDS,
+    __TEMPLATE_DIR__,
+    get_inserted_styles,
+    replace_with_data,
+)
+from github_stats import StatsSnapshot
+
+load_dotenv()
+
+INDEX = """<!DOCTYPE html>
+<html>
+<head>
+<meta charset="utf-8">
+<title>github-stats preview</title>
+<style>
+body {{ margin: 0; display: flex; flex-wrap: wrap; font-family: sans-serif; }}
+section {{ flex: 1; padding: 16px; }}
+section.dark {{ background: #0d1117; color: #c9d1d9; }}
+img {{ display: block; margin-bottom: 16px; }}
+pre {{ color: #cf222e; }}
+</style>
+</head>
+<body>
+{sections}
+<script>
+const version = {version};
+setInterval(async () => {{
+    const r = await fetch("/version");
+    if (Number(await r.text()) !== version) location.reload();
+}}, 250);
+</script>
+</body>
+</html>"""
+
+
+class Preview(object):
+    """
+    Keep every card rendered from a saved snapshot, re-rendering only what a template change affects.
+    """
+
+    def __init__(self, snapshot: StatsSnapshot):
+        self.data = {template: card(snapshot) for template, card in CARDS.items()}
+        self.filled: Dict[str, str] = dict()
+        self.styles: Dict[str, Dict[str, str]] = dict()
+        self.rendered: Dict[Tuple[str, str], str] = dict()
+        self.mtimes: Dict[str, float] = dict()
+        self.version = 0
+        self.error: Optional[str] = None
+
+        self.reload_styles()
+        for template in CARDS:
+            self.reload_template(template)
+        self.mtimes = self.scan()
+
+    @staticmethod
+    def scan() -> Dict[str, float]:
+        """
+        Returns:
+            dict[str, float]: modification time of every file in the templates folder
+        """
+
+        return {
+            entry.name: entry.stat().st_mtime
+            for entry in os.scandir(__TEMPLATE_DIR__)
+            if entry.is_file()
+        }
+
+    def render(self, template: str, theme: str) -> None:
+        """
+        Apply a theme's styles to a filled template.
+
+        Args:
+            template (str): The template name, without the .svg extension.
+            theme (str): The theme name.
+        """
+
+        self.rendered[(template, theme)] = replace_with_data(
+            self.styles[theme], self.filled[template]
+        )
+
+    def reload_template(self, template: str) -> None:
+        """
+        Re-read a card template and render it for every theme.
+
+        Args:
+            template (str): The template name, without the .svg extension.
+        """
+
+        with open(os.path.join(__TEMPLATE_DIR__, f"{template}.svg"), "r") as f:
+            self.filled[template] = replace_with_data(self.data[template], f.read())
+        for theme in self.styles:
+            self.render(template, theme)
+
+    def reload_styles(self) -> None:
+        """
+        Re-read styles.json and re-render every card for the themes whose styles changed.
+        """
+
+        styles = get_inserted_styles()
+        changed = [theme for theme in styles if styles[theme] != self.styles.get(theme)]
+        self.styles = styles
+        for theme in changed:
+            for template in self.filled:
+                self.render(template, theme)
+
+    def refresh(self) -> bool:
+        """
+        Re-render whatever changed in the templates folder since the last call.
+
+        Returns:
+            bool: whether anything was re-rendered
+        """
+
+        mtimes = self.scan()
+        changed = [
+            name for name, mtime in mtimes.items() if self.mtimes.get(name) != mtime
+        ]
+        self.mtimes = mtimes
+        if len(changed) == 0:
+            return False
+
+        started = time.perf_counter()
+        try:
+            for name in changed:
+                template, extension = os.path.splitext(name)
+                if name == "styles.json":
+                    self.reload_styles()
+                elif extension == ".svg" and template in CARDS:
+                    self.reload_template(template)
+            self.error = None
+        except Exception as e:
+            self.error = f"{type(e).__name__}: {e}"
+            print(f"Failed to re-render {', '.join(changed)}: {self.error}")
+        self.version += 1
+        print(
+            f"Re-rendered {', '.join(changed)} in "
+            f"{1000 * (time.perf_counter() - started):0.1f} ms"
+        )
+        return True
+
+    def index(self) -> str:
+        """
+        Returns:
+            str: a page showing every card in every theme that reloads itself on changes
+        """
+
+        sections = ""
+        for theme in self.styles:
+            images = "".join(
+                f'<img src="/{template}-{theme}.svg?v={self.version}">'
+                for template in CARDS
+            )
+            sections += f'<section class="{theme}"><h3>{theme}</h3>{images}</section>'
+        if self.error is not None:
+            sections = f"<pre>{self.error}</pre>" + sections
+        return INDEX.format(sections=sections, version=self.version)
+
+
+async def watch(preview: Preview, interval: float) -> None:
+    """
+    Poll the templates folder for changes.
+
+    Args:
+        preview (Preview): The preview to refresh.
+        interval (float): Seconds between polls.
+    """
+
+    while True:
+        preview.refresh()
+        await asyncio.sleep(interval)
+
+
+async def main() -> None:
+    snapshot_path = os.getenv("LOAD_SNAPSHOT")
+    if not snapshot_path:
+        raise RuntimeError(
+            "Environment variable LOAD_SNAPSHOT must be set to a file saved with SAVE_SNAPSHOT."
+        )
+    port = int(os.getenv("PREVIEW_PORT", "8000"))
+
+    with open(snapshot_path, "r") as f:
+        preview = Preview(StatsSnapshot.from_json(f.read()))
+
+    async def index(request: web.Request) -> web.Response:
+        return web.Response(text=preview.index(), content_type="text/html")
+
+    async def version(request: web.Request) -> web.Response:
+        return web.Response(text=str(preview.version))
+
+    async def card(request: web.Request) -> web.Response:
+        template, _, theme = request.match_info["card"].rpartition("-")
+        svg = preview.rendered.get((template, theme))
+        if svg is None:
+            raise web.HTTPNotFound()
+        return web.Response(
+            text=svg,
+            content_type="image/svg+xml",
+            headers={"Cache-Control": "no-store"},
+        )
+
+    app = web.Application()
+    app.router.add_get("/", index)
+    app.router.add_get("/version", version)
+    app.router.add_get("/{card}.svg", card)
+
+    runner = web.AppRunner(app)
+    await runner.setup()
+    await web.TCPSite(runner, "localhost", port).start()
+    print(f"Previewing templates at http://localhost:{port}")
+    try:
+        await watch(preview, 0.1)
+    finally:
+        await runner.cleanup()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
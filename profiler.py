@@ -0,0 +1,259 @@
+#!/usr/bin/python3
+
+import asyncio
+import contextlib
+import functools
+import inspect
+import json
+import time
+from contextvars import ContextVar
+from typing import Any, Callable, Dict, Iterator, List, Optional, TypeVar
+
+
+class Span(object):
+    """
+    A timed stage of a run, recorded with the asyncio task it ran in and the span that
+    was open when it started.
+    """
+
+    __slots__ = ("id", "name", "category", "start", "end", "task", "parent", "args")
+
+    def __init__(
+        self,
+        id: int,
+        name: str,
+        category: str,
+        task: str,
+        parent: Optional["Span"],
+        args: Dict[str, Any],
+    ):
+        self.id = id
+        self.name = name
+        self.category = category
+        self.task = task
+        self.parent = parent
+        self.args = args
+        self.start = time.perf_counter()
+        self.end = self.start
+
+    @property
+    def duration(self) -> float:
+        """
+        Returns:
+            float: seconds between the start and end of the span
+        """
+
+        return self.end - self.start
+
+
+_current: ContextVar[Optional[Span]] = ContextVar("current_span", default=None)
+
+
+class Profiler(object):
+    """
+    Record nested spans across asyncio tasks and export them as a Chrome trace.
+
+    Disabled by default, in which case `span` does no bookkeeping at all.
+    """
+
+    def __init__(self, enabled: bool = False):
+        self.enabled = enabled
+        self.spans: List[Span] = list()
+
+    @contextlib.contextmanager
+    def span(self, name: str, category: str = "", **args: Any) -> Iterator[None]:
+        """
+        Time the enclosed block as a child of the currently open span.
+
+        Args:
+            name (str): what the block does, shown in the trace viewer
+            category (str, optional): kind of work, e.g. "graphql" or "render". Defaults to "".
+            **args: extra details to attach to the span
+        """
+
+        if not self.enabled:
+            yield
+            return
+
+        # Task names ("Task-12") are never reused, unlike the ids of finished tasks
+        task = asyncio.current_task() if _running() else None
+        span = Span(
+            len(self.spans),
+            name,
+            category,
+            "main" if task is None else task.get_name(),
+            _current.get(),
+            args,
+        )
+        self.spans.append(span)
+        reset = _current.set(span)
+        try:
+            yield
+        finally:
+            span.end = time.perf_counter()
+            _current.reset(reset)
+
+    def trace(self) -> Dict[str, Any]:
+        """
+        Returns:
+            Dict[str, Any]: the spans in Chrome trace-event format
+        """
+
+        if len(self.spans) == 0:
+            return {"traceEvents": []}
+        origin = min(span.start for span in self.spans)
+        tids: Dict[str, int] = dict()
+        for span in self.spans:
+            tids.setdefault(span.task, len(tids) + 1)
+        events: List[Dict[str, Any]] = [
+            {
+                "name": "thread_name",
+                "ph": "M",
+                "pid": 1,
+                "tid": tid,
+                "args": {"name": name},
+            }
+            for name, tid in tids.items()
+        ]
+        for span in self.spans:
+            events.append(
+                {
+                    "name": span.name,
+                    "cat": span.category,
+                    "ph": "X",
+                    "ts": 1e6 * (span.start - origin),
+                    "dur": 1e6 * span.duration,
+                    "pid": 1,
+                    "tid": tids[span.task],
+                    "args": {
+                        "task": span.task,
+                        "parent": None if span.parent is None else span.parent.name,
+                        **{k: str(v) for k, v in span.args.items()},
+                    },
+                }
+            )
+        return {"traceEvents": events, "displayTimeUnit": "ms"}
+
+    def export(self, path: str) -> None:
+        """
+        Write the trace to a file that chrome://tracing or ui.perfetto.dev can open.
+
+        Args:
+            path (str): output file
+        """
+
+        with open(path, "w") as f:
+            json.dump(self.trace(), f)
+
+    def critical_path(self) -> List[Span]:
+        """
+        Walk back from the span that finished last, at each level following the child
+        that finished last before the point being explained.
+
+        Returns:
+            List[Span]: the spans that determined the total run time, outermost first
+        """
+
+        children: Dict[Optional[int], List[Span]] = dict()
+        for span in self.spans:
+            parent = None if span.parent is None else span.parent.id
+            children.setdefault(parent, []).append(span)
+
+        def walk(spans: List[Span], until: float, since: float) -> List[Span]:
+            path: List[Span] = []
+            while True:
+                candidates = [
+                    s for s in spans if s.end <= until + 1e-9 and s.start >= since
+                ]
+                if len(candidates) == 0:
+                    return path
+                last = max(candidates, key=lambda s: s.end)
+                path = (
+                    [last]
+                    + walk(children.get(last.id, []), last.end, last.start)
+                    + path
+                )
+                until = last.start
+
+        if len(self.spans) == 0:
+            return []
+        return walk(children.get(None, []), float("inf"), float("-inf"))
+
+    def summary(self, minimum: float = 0.001) -> str:
+        """
+        Args:
+            minimum (float, optional): seconds below which spans are left out. Defaults to 0.001.
+
+        Returns:
+            str: the critical path as text, with each span's time not covered by its children
+        """
+
+        path = self.critical_path()
+        on_path = {span.id for span in path}
+        lines = ["Critical path:"]
+        for span in path:
+            if span.duration < minimum:
+                continue
+            depth = 0
+            parent = span.parent
+            while parent is not None:
+                depth += 1 if parent.id in on_path else 0
+                parent = parent.parent
+            covered = sum(
+                s.duration
+                for s in path
+                if s.parent is not None and s.parent.id == span.id
+            )
+            lines.append(
+                f"{'  ' * depth}{1000 * span.duration:9.1f} ms "
+                f"(self {1000 * max(0.0, span.duration - covered):8.1f} ms) "
+                f"{span.name} [{span.task}]"
+            )
+        return "\n".join(lines)
+
+
+def _running() -> bool:
+    try:
+        asyncio.get_running_loop()
+        return True
+    except RuntimeError:
+        return False
+
+
+profiler = Profiler()
+
+T = TypeVar("T")
+
+
+def profiled(
+    category: str = "", name: Optional[str] = None, detail: Optional[str] = None
+) -> Callable[[T], T]:
+    """
+    Record every call of a coroutine function as a span.
+
+    Args:
+        category (str, optional): span category. Defaults to "".
+        name (Optional[str], optional): span name. Defaults to the function's qualified name.
+        detail (Optional[str], optional): argument whose value is attached to the span. Defaults to None.
+
+    Returns:
+        Callable[[T], T]: decorator
+    """
+
+    def decorator(function: Any) -> Any:
+        signature = inspect.signature(function)
+        label = function.__qualname__ if name is None else name
+
+        @functools.wraps(function)
+        async def wrapper(*args: Any, **kwargs: Any) -> Any:
+            if not profiler.enabled:
+                return await function(*args, **kwargs)
+            details = dict()
+            if detail is not None:
+                details[detail] = signature.bind(*args, **kwargs).arguments.get(detail)
+            with profiler.span(label, category, **details):
+                return await function(*args, **kwargs)
+
+        return wrapper
+
+    return decorator
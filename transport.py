@@ -0,0 +1,389 @@
+#!/usr/bin/python3
+
+import abc
+import asyncio
+import json
+import aiohttp
+from typing import Any, AsyncIterator, Dict, Mapping, Optional, Tuple, Type
+
+
+class JsonCodec(object):
+    """
+    Encode and decode JSON with the standard library.
+    """
+
+    name = "json"
+
+    def dumps(self, obj: Any) -> bytes:
+        """
+        Args:
+            obj (Any): value to encode
+
+        Returns:
+            bytes: compact JSON
+        """
+
+        return json.dumps(obj, separators=(",", ":")).encode()
+
+    def loads(self, raw: bytes) -> Any:
+        """
+        Args:
+            raw (bytes): JSON to decode
+
+        Returns:
+            Any: decoded value
+        """
+
+        return json.loads(raw)
+
+
+class OrjsonCodec(JsonCodec):
+    """
+    Encode and decode JSON with orjson, which is considerably faster on large responses.
+    """
+
+    name = "orjson"
+
+    def __init__(self):
+        try:
+            import orjson
+        except ImportError:
+            raise RuntimeError(
+                "JSON_CODEC=orjson requires orjson (pip install orjson)"
+            ) from None
+        self._orjson = orjson
+
+    def dumps(self, obj: Any) -> bytes:
+        return self._orjson.dumps(obj)
+
+    def loads(self, raw: bytes) -> Any:
+        return self._orjson.loads(raw)
+
+
+CODECS = {
+    "json": JsonCodec,
+    "orjson": OrjsonCodec,
+}
+
+
+class TransportResponse(abc.ABC):
+    """
+    The parts of an HTTP response that Queries relies on, independent of the backend.
+    """
+
+    def __init__(
+        self,
+        status: int,
+        headers: Mapping[str, str],
+        codec: JsonCodec,
+        http_version: str = "HTTP/1.1",
+    ):
+        self.status = status
+        self.headers = headers
+        self.codec = codec
+        self.http_version = http_version
+
+    async def read(self) -> bytes:
+        """
+        Returns:
+            bytes: the whole (decompressed) response body
+        """
+
+        return b"".join([chunk async for chunk in self.iter_chunks(65536)])
+
+    async def json(self) -> Any:
+        """
+        Returns:
+            Any: the decoded JSON body, or None if the body is empty
+        """
+
+        raw = await self.read()
+        return self.codec.loads(raw) if raw.strip() else None
+
+    @abc.abstractmethod
+    def iter_chunks(self, size: int) -> AsyncIterator[bytes]:
+        """
+        Args:
+            size (int): largest chunk to yield
+
+        Returns:
+            AsyncIterator[bytes]: the (decompressed) response body, as it arrives
+        """
+
+
+class Transport(abc.ABC):
+    """
+    Sends HTTP requests for Queries. Subclasses wrap a specific HTTP client library.
+    """
+
+    name = "base"
+
+    # Seconds a request may take, including its body, before it is abandoned
+    timeout = 300.0
+
+    def __init__(self, codec: Optional[JsonCodec] = None, compress: bool = True):
+        self.codec = JsonCodec() if codec is None else codec
+        self.compress = compress
+        # Exceptions the backend raises when a request runs out of time
+        self.timeout_errors: Tuple[Type[BaseException], ...] = (asyncio.TimeoutError,)
+
+    def headers(self, headers: Dict[str, str]) -> Dict[str, str]:
+        """
+        Args:
+            headers (Dict[str, str]): headers for a request
+
+        Returns:
+            Dict[str, str]: the headers with content negotiation added
+        """
+
+        return {
+            "Accept-Encoding": "gzip, deflate" if self.compress else "identity",
+            **headers,
+        }
+
+    @abc.abstractmethod
+    def request(
+        self,
+        method: str,
+        url: str,
+        headers: Dict[str, str],
+        params: Optional[Tuple] = None,
+        payload: Any = None,
+    ) -> "ResponseContext":
+        """
+        Args:
+            method (str): HTTP method
+            url (str): absolute URL
+            headers (Dict[str, str]): request headers
+            params (Optional[Tuple], optional): query string parameters. Defaults to None.
+            payload (Any, optional): value to send as a JSON body. Defaults to None.
+
+        Returns:
+            ResponseContext: async context manager yielding a TransportResponse
+        """
+
+    async def close(self) -> None:
+        """
+        Release pooled connections.
+        """
+
+    async def __aenter__(self) -> "Transport":
+        return self
+
+    async def __aexit__(self, *exc_info: Any) -> None:
+        await self.close()
+
+
+class ResponseContext(object):
+    """
+    Async context manager around a backend request, so every backend can be used as
+    `async with transport.request(...) as response`.
+    """
+
+    def __init__(self, enter: Any, exit: Any):
+        self._enter = enter
+        self._exit = exit
+
+    async def __aenter__(self) -> TransportResponse:
+        return await self._enter()
+
+    async def __aexit__(self, *exc_info: Any) -> None:
+        await self._exit()
+
+
+class AiohttpResponse(TransportResponse):
+    def __init__(self, response: aiohttp.ClientResponse, codec: JsonCodec):
+        super().__init__(
+            response.status,
+            response.headers,
+            codec,
+            f"HTTP/{response.version.major}.{response.version.minor}",
+        )
+        self._response = response
+
+    async def read(self) -> bytes:
+        return await self._response.read()
+
+    async def iter_chunks(self, size: int) -> AsyncIterator[bytes]:
+        async for chunk in self._response.content.iter_chunked(size):
+            yield chunk
+
+
+class AiohttpTransport(Transport):
+    """
+    HTTP/1.1 with a tuned aiohttp connection pool.
+    """
+
+    name = "aiohttp"
+
+    def __init__(
+        self,
+        session: Optional[aiohttp.ClientSession] = None,
+        codec: Optional[JsonCodec] = None,
+        compress: bool = True,
+        limit: int = 100,
+        limit_per_host: int = 0,
+        keepalive_timeout: float = 30.0,
+        ttl_dns_cache: int = 300,
+    ):
+        super().__init__(codec, compress)
+        self._owned = session is None
+        if session is None:
+            session = aiohttp.ClientSession(
+                connector=aiohttp.TCPConnector(
+                    limit=limit,
+                    limit_per_host=limit_per_host,
+                    keepalive_timeout=keepalive_timeout,
+                    ttl_dns_cache=ttl_dns_cache,
+                    use_dns_cache=True,
+                ),
+                auto_decompress=True,
+                timeout=aiohttp.ClientTimeout(total=self.timeout),
+            )
+        self.session = session
+
+    def request(
+        self,
+        method: str,
+        url: str,
+        headers: Dict[str, str],
+        params: Optional[Tuple] = None,
+        payload: Any = None,
+    ) -> ResponseContext:
+        state: Dict[str, aiohttp.ClientResponse] = dict()
+
+        async def enter() -> TransportResponse:
+            headers_ = self.headers(headers)
+            data = None
+            if payload is not None:
+                data = self.codec.dumps(payload)
+                headers_["Content-Type"] = "application/json"
+            state["response"] = await self.session.request(
+                method, url, headers=headers_, params=params, data=data
+            )
+            return AiohttpResponse(state["response"], self.codec)
+
+        async def exit() -> None:
+            if "response" in state:
+                state["response"].release()
+
+        return ResponseContext(enter, exit)
+
+    async def close(self) -> None:
+        if self._owned:
+            await self.session.close()
+
+
+class HttpxResponse(TransportResponse):
+    def __init__(self, response: Any, codec: JsonCodec):
+        super().__init__(
+            response.status_code, response.headers, codec, response.http_version
+        )
+        self._response = response
+
+    async def read(self) -> bytes:
+        return await self._response.aread()
+
+    async def iter_chunks(self, size: int) -> AsyncIterator[bytes]:
+        async for chunk in self._response.aiter_bytes(size):
+            yield chunk
+
+
+class Http2Transport(Transport):
+    """
+    HTTP/2 through httpx, multiplexing concurrent requests over a few connections.
+    """
+
+    name = "http2"
+
+    def __init__(
+        self,
+        codec: Optional[JsonCodec] = None,
+        compress: bool = True,
+        limit: int = 100,
+        keepalive_timeout: float = 30.0,
+        prior_knowledge: bool = False,
+    ):
+        super().__init__(codec, compress)
+        try:
+            import httpx
+        except ImportError:
+            raise RuntimeError(
+                "HTTP_BACKEND=http2 requires httpx with HTTP/2 support "
+                '(pip install "httpx[http2]")'
+            ) from None
+        # Without HTTP/1.1, httpx speaks HTTP/2 straight away on plain-text (h2c) URLs
+        self.client = httpx.AsyncClient(
+            http1=not prior_knowledge,
+            http2=True,
+            limits=httpx.Limits(
+                max_connections=limit,
+                max_keepalive_connections=limit,
+                keepalive_expiry=keepalive_timeout,
+            ),
+            timeout=httpx.Timeout(self.timeout),
+        )
+        self.timeout_errors = (asyncio.TimeoutError, httpx.TimeoutException)
+
+    def request(
+        self,
+        method: str,
+        url: str,
+        headers: Dict[str, str],
+        params: Optional[Tuple] = None,
+        payload: Any = None,
+    ) -> ResponseContext:
+        state: Dict[str, Any] = dict()
+
+        async def enter() -> TransportResponse:
+            headers_ = self.headers(headers)
+            content = None
+            if payload is not None:
+                content = self.codec.dumps(payload)
+                headers_["Content-Type"] = "application/json"
+            request = self.client.build_request(
+                method, url, headers=headers_, params=params, content=content
+            )
+            state["response"] = await self.client.send(request, stream=True)
+            return HttpxResponse(state["response"], self.codec)
+
+        async def exit() -> None:
+            if "response" in state:
+                await state["response"].aclose()
+
+        return ResponseContext(enter, exit)
+
+    async def close(self) -> None:
+        await self.client.aclose()
+
+
+TRANSPORTS = {
+    "aiohttp": AiohttpTransport,
+    "http2": Http2Transport,
+}
+
+
+def get_transport(
+    backend: str = "aiohttp", codec: str = "json", **options: Any
+) -> Transport:
+    """
+    Create a transport by name, as selected with HTTP_BACKEND and JSON_CODEC.
+
+    Args:
+        backend (str, optional): "aiohttp" or "http2". Defaults to "aiohttp".
+        codec (str, optional): "json" or "orjson". Defaults to "json".
+        **options: backend options, e.g. compress, limit or keepalive_timeout
+
+    Returns:
+        Transport: the configured transport
+    """
+
+    if backend not in TRANSPORTS:
+        raise ValueError(
+            f"Unknown HTTP backend {backend!r}, expected one of {', '.join(TRANSPORTS)}"
+        )
+    if codec not in CODECS:
+        raise ValueError(
+            f"Unknown JSON codec {codec!r}, expected one of {', '.join(CODECS)}"
+        )
+    return TRANSPORTS[backend](codec=CODECS[codec](), **options)